@@ -0,0 +1,36 @@
+"""add classification_cache table
+
+Revision ID: 3b7e91c0d2a4
+Revises: 5ea69a82a8df
+Create Date: 2026-10-16 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e91c0d2a4'
+down_revision: Union[str, Sequence[str], None] = '5ea69a82a8df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('classification_cache',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('model_version', sa.String(length=50), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('content_hash', 'model_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('classification_cache')
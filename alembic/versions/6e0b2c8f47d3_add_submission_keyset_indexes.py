@@ -0,0 +1,33 @@
+"""add composite indexes for keyset pagination of submissions
+
+Revision ID: 6e0b2c8f47d3
+Revises: d41a7f3b9c15
+Create Date: 2026-10-16 14:21:17.330985
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e0b2c8f47d3'
+down_revision: Union[str, Sequence[str], None] = 'd41a7f3b9c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_submissions_user_status_created_id', 'submissions', ['user_id', 'status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_submissions_user_created_id', 'submissions', ['user_id', 'created_at', 'id'], unique=False)
+    # (user_id, created_at, id) also serves plain user_id lookups
+    op.drop_index(op.f('ix_submissions_user_id'), table_name='submissions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_submissions_user_id'), 'submissions', ['user_id'], unique=False)
+    op.drop_index('ix_submissions_user_created_id', table_name='submissions')
+    op.drop_index('ix_submissions_user_status_created_id', table_name='submissions')
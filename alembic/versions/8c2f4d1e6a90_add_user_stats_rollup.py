@@ -0,0 +1,51 @@
+"""add user_stats rollup table
+
+Revision ID: 8c2f4d1e6a90
+Revises: 3b7e91c0d2a4
+Create Date: 2026-10-16 11:40:02.512739
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f4d1e6a90'
+down_revision: Union[str, Sequence[str], None] = '3b7e91c0d2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('item_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('recyclable_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('co2_total', sa.Float(), server_default='0', nullable=False),
+    sa.Column('revenue_total', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # backfill from existing classified submissions
+    op.execute("""
+        INSERT INTO user_stats (user_id, item_count, recyclable_count, co2_total, revenue_total)
+        SELECT user_id,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE recyclable IS TRUE),
+               COALESCE(SUM(co2_saved), 0),
+               COALESCE(SUM(resell_value), 0)
+        FROM submissions
+        WHERE status = 'CLASSIFIED'
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
@@ -0,0 +1,28 @@
+"""add thumbnail_urls to submissions
+
+Revision ID: b2d94e7a1f08
+Revises: 6e0b2c8f47d3
+Create Date: 2026-10-16 16:02:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d94e7a1f08'
+down_revision: Union[str, Sequence[str], None] = '6e0b2c8f47d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('submissions', sa.Column('thumbnail_urls', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('submissions', 'thumbnail_urls')
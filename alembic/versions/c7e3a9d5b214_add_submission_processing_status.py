@@ -0,0 +1,38 @@
+"""add PROCESSING submission status
+
+Revision ID: c7e3a9d5b214
+Revises: f3a81c6d2e57
+Create Date: 2026-10-16 18:40:27.511203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e3a9d5b214'
+down_revision: Union[str, Sequence[str], None] = 'f3a81c6d2e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE submissionstatus ADD VALUE IF NOT EXISTS 'PROCESSING' AFTER 'PENDING'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # postgres cannot drop an enum value: hand claimed rows back and recreate the type without it
+    op.execute("UPDATE submissions SET status = 'PENDING' WHERE status = 'PROCESSING'")
+    op.execute("ALTER TYPE submissionstatus RENAME TO submissionstatus_old")
+    op.execute("CREATE TYPE submissionstatus AS ENUM ('PENDING', 'CLASSIFIED', 'FAILED')")
+    op.execute(
+        "ALTER TABLE submissions ALTER COLUMN status TYPE submissionstatus "
+        "USING status::text::submissionstatus"
+    )
+    op.execute("DROP TYPE submissionstatus_old")
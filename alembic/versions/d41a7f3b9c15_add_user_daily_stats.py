@@ -0,0 +1,53 @@
+"""add user_daily_stats aggregate table
+
+Revision ID: d41a7f3b9c15
+Revises: 8c2f4d1e6a90
+Create Date: 2026-10-16 13:05:51.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7f3b9c15'
+down_revision: Union[str, Sequence[str], None] = '8c2f4d1e6a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('material', sa.String(length=255), nullable=False),
+    sa.Column('item_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('recyclable_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('co2_total', sa.Float(), server_default='0', nullable=False),
+    sa.Column('revenue_total', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'material')
+    )
+
+    # backfill from existing classified submissions
+    op.execute("""
+        INSERT INTO user_daily_stats (user_id, day, material, item_count, recyclable_count, co2_total, revenue_total)
+        SELECT user_id,
+               (created_at AT TIME ZONE 'UTC')::date,
+               COALESCE(material_type, classification, 'unknown'),
+               COUNT(*),
+               COUNT(*) FILTER (WHERE recyclable IS TRUE),
+               COALESCE(SUM(co2_saved), 0),
+               COALESCE(SUM(resell_value), 0)
+        FROM submissions
+        WHERE status = 'CLASSIFIED'
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_stats')
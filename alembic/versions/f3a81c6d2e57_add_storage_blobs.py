@@ -0,0 +1,49 @@
+"""add storage_blobs reference counts
+
+Revision ID: f3a81c6d2e57
+Revises: b2d94e7a1f08
+Create Date: 2026-10-16 17:12:09.804416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a81c6d2e57'
+down_revision: Union[str, Sequence[str], None] = 'b2d94e7a1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('storage_blobs',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+    # backfill from the urls of existing submissions (older uploads keep their flat uuid names)
+    op.execute("""
+        INSERT INTO storage_blobs (key, ref_count)
+        SELECT key, COUNT(*)
+        FROM (
+            SELECT regexp_replace(image_path_url, '^.*/', '') AS key
+            FROM submissions
+            UNION ALL
+            SELECT regexp_replace(thumbnail.value, '^.*/', '')
+            FROM submissions, json_each_text(submissions.thumbnail_urls) AS thumbnail
+            WHERE submissions.thumbnail_urls IS NOT NULL
+        ) refs
+        GROUP BY key
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('storage_blobs')
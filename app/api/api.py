@@ -3,10 +3,12 @@ from app.api.routes import health
 from app.api.routes import auth
 from app.api.routes import submissions
 from app.api.routes import stats
+from app.api.routes import models
 
 
 router = APIRouter()
 router.include_router(health.router)
 router.include_router(auth.router)
 router.include_router(submissions.router)
-router.include_router(stats.router)
\ No newline at end of file
+router.include_router(stats.router)
+router.include_router(models.router)
\ No newline at end of file
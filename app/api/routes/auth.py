@@ -1,41 +1,60 @@
 from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core import security
 from app.core.config import settings
 from app.models.user import User
 from app.schema.auth import  UserCreate, UserResponse
 from app.dependencies.auth import get_current_user
+from app.utils.admission import AdmissionRejected
+from app.utils.password_hashing import password_hasher
+from app.utils.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+
+def _overloaded(rejected: AdmissionRejected) -> HTTPException:
+    """503 with Retry-After when the password hashing executor is saturated"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Server is busy: {rejected.reason}",
+        headers={"Retry-After": str(rejected.retry_after)},
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_in: UserCreate, response: Response, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, response: Response, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     
     is_strong, message = security.validate_password_strength(user_in.password) # custom defined func in security
     if not is_strong:
         raise HTTPException(status_code=400, detail=message)
     
-    if db.query(User).filter(User.email == user_in.email).first():
+    if (await db.execute(select(User.id).where(User.email == user_in.email))).first():
         raise HTTPException(status_code=409, detail="User with this email already exists")
     
-    if db.query(User).filter(User.username == user_in.username).first():
+    if (await db.execute(select(User.id).where(User.username == user_in.username))).first():
         raise HTTPException(status_code=409, detail="Username already taken")
     
+    try:
+        password_hash = await password_hasher.hash(user_in.password)
+    except AdmissionRejected as rejected:
+        raise _overloaded(rejected)
+    
     user = User(
         email=user_in.email,
         username=user_in.username,
-        password_hash=security.get_password_hash(user_in.password),
+        password_hash=password_hash,
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
@@ -55,25 +74,32 @@ def register(user_in: UserCreate, response: Response, db: Session = Depends(get_
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user)):
     """Get current user profile"""
     return current_user
 
 @router.post("/login", response_model=UserResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), response: Response = None, db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), response: Response = None, db: AsyncSession = Depends(get_async_db)):
     
-    user = db.query(User).filter(
+    user = (await db.execute(select(User).where(
         (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    ))).scalars().first()
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     
-    if not security.verify_password(form_data.password, user.password_hash):
+    try:
+        is_valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.password_hash)
+    except AdmissionRejected as rejected:
+        raise _overloaded(rejected)
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    db.commit()
+    # stored hash used outdated argon2 parameters (or bcrypt), upgrade it
+    if new_hash is not None:
+        user.password_hash = new_hash
+    await db.commit()
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
@@ -92,8 +118,11 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), response: Response =
     return user
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(request: Request, response: Response):
     """Clear cookies"""
+    token = request.cookies.get("auth_token")
+    if token:
+        principal_cache.invalidate_token(token)
     response.delete_cookie(key="auth_token")
     return {"message": "Successfully logged out!"}
 
@@ -1,7 +1,45 @@
 from fastapi import APIRouter
 
+from app.core.config import settings
+from app.utils.admission import inference_admission
+from app.utils.cascade import cascade_stats
+from app.utils.inference_pool import inference_pool
+from app.utils.ml_core_logic import get_batching_stats, get_model_version, registry
+from app.utils.password_hashing import password_hasher
+from app.utils.precision import get_drift_report
+from app.utils.principal_cache import principal_cache
+from app.utils.result_cache import result_cache
+from app.utils.submission_worker import submission_workers
+
 router = APIRouter(prefix="/health")
 
 @router.get("/")
 def get_health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@router.get("/auth")
+def get_auth_health():
+    """Hit rates of the get_current_user cache and password hashing load"""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+    }
+
+@router.get("/inference")
+def get_inference_health():
+    """Model version and runtime metrics for the inference pipeline"""
+    return {
+        "model": {
+            "version": get_model_version(),
+            "registry": registry.status(),
+            "backend": settings.INFERENCE_BACKEND,
+            "precision": settings.INFERENCE_PRECISION,
+            "precision_drift": get_drift_report(settings.INFERENCE_PRECISION),
+        },
+        "admission": inference_admission.stats(),
+        "batching": get_batching_stats(),
+        "cascade": cascade_stats.stats(),
+        "submission_workers": submission_workers.stats(),
+        "inference_pool": inference_pool.stats(),
+        "result_cache": result_cache.stats(),
+    }
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Response
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.utils.admission import inference_admission
+from app.utils.inference_pool import inference_pool
+from app.utils.metrics import COMPONENT_REGISTRY, render_metrics
+from app.utils.ml_core_logic import get_batching_stats
+from app.utils.result_cache import result_cache
+from app.utils.submission_worker import submission_workers
+
+router = APIRouter()
+
+
+class ComponentCollector:
+    """Queue depths and counters read from the pipeline components on every scrape"""
+
+    def collect(self):
+        admission = inference_admission.stats()
+        batching = get_batching_stats()
+
+        queue_depth = GaugeMetricFamily(
+            "trashos_inference_queue_depth", "Work waiting in each inference queue", labels=["queue"]
+        )
+        queue_depth.add_metric(["admission"], admission["queue_depth"])
+        queue_depth.add_metric(["batcher_model_major"], batching["model_major"]["queue_depth"])
+        queue_depth.add_metric(["batcher_model_subclass"], batching["model_subclass"]["queue_depth"])
+        queue_depth.add_metric(["batcher_model_light"], batching["model_light"]["queue_depth"])
+        queue_depth.add_metric(["submission_workers"], submission_workers.stats()["queue_depth"])
+        queue_depth.add_metric(["inference_pool"], inference_pool.stats()["in_flight"])
+        yield queue_depth
+
+        yield GaugeMetricFamily(
+            "trashos_inference_active", "Callers currently holding an inference slot", value=admission["active"]
+        )
+
+        rejected = CounterMetricFamily(
+            "trashos_inference_rejected", "Uploads turned away by admission control", labels=["reason"]
+        )
+        rejected.add_metric(["queue_full"], admission["rejected_queue_full"])
+        rejected.add_metric(["timeout"], admission["rejected_timeout"])
+        yield rejected
+
+        # trashos_speculative_* and trashos_cascade_items are plain Counters (app/utils/speculation.py,
+        # app/utils/cascade.py) recorded wherever inference runs, pool workers included (multiprocess mode)
+
+        yield GaugeMetricFamily(
+            "trashos_result_cache_hit_ratio", "Classification result cache hit rate", value=result_cache.stats()["hit_rate"]
+        )
+
+
+COMPONENT_REGISTRY.register(ComponentCollector())
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
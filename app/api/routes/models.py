@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.dependencies.auth import get_admin_user
+from app.utils.ml_core_logic import registry
+from app.utils.model_registry import ActivationInProgress, UnknownModelVersion
+
+router = APIRouter(prefix="/admin/models", tags=["Models"], dependencies=[Depends(get_admin_user)])
+
+
+@router.get("/")
+def get_models():
+    """Available versions, the active one and any activation in progress"""
+    return registry.status()
+
+
+@router.post("/{version}/activate", status_code=status.HTTP_202_ACCEPTED)
+def activate_model(version: str):
+    """Load and warm up a version in the background, then switch traffic to it"""
+    if version == registry.active_version:
+        raise HTTPException(status_code=409, detail=f"Model version '{version}' is already active")
+    try:
+        registry.activate_in_background(version)
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ActivationInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return registry.status()
+
+
+@router.post("/rollback")
+def rollback_model():
+    """Switch back to the previously active version"""
+    try:
+        version = registry.rollback()
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ActivationInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"rolled_back_to": version, **registry.status()}
@@ -1,44 +1,67 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import DateTime, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.dependencies.auth import get_current_user
 from app.models.user import User
-from app.models.submission import Submission, SubmissionStatus
-from app.schema.stats import UserStatsResponse, PeriodStatsResponse, ImpactStatsResponse
+from app.models.user_stats import UserDailyStats, UserStats
+from app.schema.stats import (
+    UserStatsResponse,
+    PeriodStatsResponse,
+    ImpactStatsResponse,
+    SeriesBucket,
+    SeriesStatsResponse,
+)
 
 router = APIRouter(prefix="/stats", tags=["Statistics"])
 
+MAX_SERIES_DAYS = 366 * 5
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    """Start of the bucket a day falls in (weeks start on Monday, like date_trunc)"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_starts(start: date, end: date, granularity: str) -> list[date]:
+    """Every bucket start between start and end, so empty buckets are returned as zeros"""
+    starts = []
+    current = _bucket_start(start, granularity)
+    while current <= end:
+        starts.append(current)
+        if granularity == "week":
+            current += timedelta(days=7)
+        elif granularity == "month":
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=1)
+    return starts
+
 @router.get("/user", response_model=UserStatsResponse)
-def get_user_stats(
+async def get_user_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user statistics for dashboard header"""
     
-    # Get all classified submissions for the user
-    classified_submissions = db.query(Submission).filter(
-        Submission.user_id == current_user.id,
-        Submission.status == SubmissionStatus.CLASSIFIED
-    ).all()
+    # Totals come from the per-user rollup row, not from scanning submissions
+    stats = await db.get(UserStats, current_user.id)
     
-    # Calculate total CO2 saved (in grams) and convert to approximate kg
-    total_co2 = sum(
-        float(s.co2_saved) if s.co2_saved else 0.0 
-        for s in classified_submissions
-    )
+    # Total CO2 saved is stored in grams, convert to approximate kg
+    total_co2 = float(stats.co2_total) if stats else 0.0
     total_kg = total_co2/1000.0
     
-    # Calculate total revenue
-    total_revenue = sum(
-        float(s.resell_value) if s.resell_value else 0.0 
-        for s in classified_submissions
-    )
+    # Total revenue
+    total_revenue = float(stats.revenue_total) if stats else 0.0
     
     # Format joined date
     joined_date = current_user.created_at.strftime("%d/%m/%Y")
@@ -52,37 +75,29 @@ def get_user_stats(
 
 
 @router.get("/period", response_model=PeriodStatsResponse)
-def get_period_stats(
+async def get_period_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get period statistics for dashboard cards (items recycled)"""
     
     now = datetime.utcnow()
     
-    # Calculate date boundaries
-    one_week_ago = now - timedelta(days=7)
-    one_month_ago = now - timedelta(days=30)
-    one_year_ago = now - timedelta(days=365)
-    
-    # Count classified submissions in each period
-    weekly_count = db.query(func.count(Submission.id)).filter(
-        Submission.user_id == current_user.id,
-        Submission.status == SubmissionStatus.CLASSIFIED,
-        Submission.created_at >= one_week_ago
-    ).scalar() or 0
-    
-    monthly_count = db.query(func.count(Submission.id)).filter(
-        Submission.user_id == current_user.id,
-        Submission.status == SubmissionStatus.CLASSIFIED,
-        Submission.created_at >= one_month_ago
-    ).scalar() or 0
-    
-    yearly_count = db.query(func.count(Submission.id)).filter(
-        Submission.user_id == current_user.id,
-        Submission.status == SubmissionStatus.CLASSIFIED,
-        Submission.created_at >= one_year_ago
-    ).scalar() or 0
+    # Calculate day boundaries (the daily rollup is bucketed by UTC day)
+    one_week_ago = (now - timedelta(days=7)).date()
+    one_month_ago = (now - timedelta(days=30)).date()
+    one_year_ago = (now - timedelta(days=365)).date()
+    
+    # One pass over at most 365 pre-aggregated rows per material
+    items = UserDailyStats.item_count
+    weekly_count, monthly_count, yearly_count = (await db.execute(select(
+        func.coalesce(func.sum(items).filter(UserDailyStats.day >= one_week_ago), 0),
+        func.coalesce(func.sum(items).filter(UserDailyStats.day >= one_month_ago), 0),
+        func.coalesce(func.sum(items), 0),
+    ).where(
+        UserDailyStats.user_id == current_user.id,
+        UserDailyStats.day >= one_year_ago
+    ))).one()
     
     return PeriodStatsResponse(
         yearly=str(yearly_count),
@@ -92,35 +107,22 @@ def get_period_stats(
 
 
 @router.get("/impact", response_model=ImpactStatsResponse)
-def get_impact_stats(
+async def get_impact_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get impact statistics for statistics page"""
     
-    # Get all classified submissions
-    classified_submissions = db.query(Submission).filter(
-        Submission.user_id == current_user.id,
-        Submission.status == SubmissionStatus.CLASSIFIED
-    ).all()
+    stats = await db.get(UserStats, current_user.id)
     
     # Count recycled items (only recyclable ones)
-    recycled_items = sum(
-        1 for s in classified_submissions 
-        if s.recyclable is True
-    )
+    recycled_items = stats.recyclable_count if stats else 0
     
     # Calculate total CO2 saved (in kg)
-    co2_averted = sum(
-        float(s.co2_saved) / 1000.0 if s.co2_saved else 0.0 
-        for s in classified_submissions
-    )
+    co2_averted = float(stats.co2_total) / 1000.0 if stats else 0.0
     
     # Calculate total earned
-    earned = sum(
-        float(s.resell_value) if s.resell_value else 0.0 
-        for s in classified_submissions
-    )
+    earned = float(stats.revenue_total) if stats else 0.0
     
     # Estimate trees saved (approximately 1 tree per 20kg of CO2 saved)
     trees_saved = co2_averted / 23.5
@@ -132,3 +134,62 @@ def get_impact_stats(
         earned=round(earned, 2),
         treesSaved=round(trees_saved, 2),
     )
+
+
+@router.get("/series", response_model=SeriesStatsResponse)
+async def get_series_stats(
+    granularity: Literal["day", "week", "month"] = Query("day"),
+    start: Optional[date] = Query(None, description="First day (UTC), defaults to 30 days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC), defaults to today"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get activity series (items, CO2, revenue, per-material counts) in day/week/month buckets"""
+    
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    if (end - start).days > MAX_SERIES_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range cannot be longer than {MAX_SERIES_DAYS} days"
+        )
+    
+    # Aggregate the daily rollup rows into buckets in the database
+    bucket = func.date_trunc(granularity, cast(UserDailyStats.day, DateTime)).label("bucket")
+    rows = (await db.execute(select(
+        bucket,
+        UserDailyStats.material,
+        func.sum(UserDailyStats.item_count),
+        func.sum(UserDailyStats.recyclable_count),
+        func.sum(UserDailyStats.co2_total),
+        func.sum(UserDailyStats.revenue_total),
+    ).where(
+        UserDailyStats.user_id == current_user.id,
+        UserDailyStats.day >= start,
+        UserDailyStats.day <= end
+    ).group_by(bucket, UserDailyStats.material))).all()
+    
+    buckets = {
+        bucket_start: SeriesBucket(start=bucket_start)
+        for bucket_start in _bucket_starts(start, end, granularity)
+    }
+    for bucket_ts, material, items, recyclable, co2, revenue in rows:
+        entry = buckets[bucket_ts.date()]
+        entry.items += int(items or 0)
+        entry.recycledItems += int(recyclable or 0)
+        entry.co2Averted += float(co2 or 0.0) / 1000.0  # grams -> kg
+        entry.earned += float(revenue or 0.0)
+        entry.materials[material] = entry.materials.get(material, 0) + int(items or 0)
+    
+    for entry in buckets.values():
+        entry.co2Averted = round(entry.co2Averted, 2)
+        entry.earned = round(entry.earned, 2)
+    
+    return SeriesStatsResponse(
+        granularity=granularity,
+        start=start,
+        end=end,
+        buckets=list(buckets.values())
+    )
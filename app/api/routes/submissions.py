@@ -1,161 +1,395 @@
-import shutil
 from typing import List, Optional
 from uuid import UUID
-import uuid
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status, Query
+import mimetypes
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select, tuple_
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import get_async_db, get_db
 from app.dependencies.auth import get_current_user
 from app.models.user import User
 from app.models.submission import Submission, SubmissionStatus
-from app.schema.submission import SubmissionCreate, SubmissionResponse, SubmissionList
-from app.utils.file_upload_validation import TEMP_DIR, validate_image_file
-from app.utils.ml_func import process_with_ml_model
+from app.schema.submission import (
+    SubmissionCreate,
+    SubmissionResponse,
+    SubmissionList,
+    SubmissionBatchItem,
+    SubmissionBatchResponse,
+)
+from app.utils.admission import AdmissionRejected, inference_admission
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.file_upload_validation import ingest_upload
+from app.utils.metrics import timed_commit
+from app.utils.storage import content_etag, is_valid_key, shard_path, storage
+from app.utils.submission_processing import (
+    apply_cached_result,
+    apply_ml_results,
+    classify_submission,
+    classify_uploads,
+)
+from app.utils.submission_worker import submission_workers
 
 router = APIRouter(prefix="/submissions", tags=["Submissions"])
 
 
+def _overloaded(rejected: AdmissionRejected) -> HTTPException:
+    """503 with Retry-After when inference is saturated"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Server is busy: {rejected.reason}",
+        headers={"Retry-After": str(rejected.retry_after)},
+    )
+
+
 @router.post("/", response_model=SubmissionResponse, status_code=status.HTTP_201_CREATED)
 def create_submission(
+    response: Response,
     file: UploadFile = File(...),
+    async_processing: Optional[bool] = Query(None, description="Return 202 and classify in the background"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):  
     """
     Create new submission by uploading image file
-    Processes file with ML model and saves results to database
+    Processes file with ML model and saves results to database.
+    In async mode the submission is returned as PENDING with 202 and
+    classified by background workers; poll GET /submissions/{id} until the
+    status leaves pending/processing.
+    With IMAGE_NORMALIZE the response still points at the original upload: the
+    WebP copy and thumbnails are written by the background workers afterwards.
+    Stays a sync handler on the sync session: inference needs a worker thread anyway.
     """
+    if async_processing is None:
+        async_processing = settings.SUBMISSION_PROCESSING_MODE == "async"
 
-    validate_image_file(file)
-    file_extension = Path(file.filename).suffix.lower()
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = TEMP_DIR / unique_filename
-    file_url = f"/api/submissions/files/{unique_filename}"
-    
+    # Inline classification needs an inference slot; reject early, before anything is stored
+    slot_held = False
+    if not async_processing:
+        try:
+            inference_admission.acquire()
+            slot_held = True
+        except AdmissionRejected as rejected:
+            file.file.close()
+            raise _overloaded(rejected)
+
+    upload = None
+    submission = None
     try:
-        # Write the uploaded file to disk
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # One pass over the body: type check, size limit, hash and stream it into storage.
+        # For inline classification the bytes stay in memory as well, the models decode them from there
+        upload = ingest_upload(file, keep_data=not async_processing)
 
         # Create initial submission record
         submission = Submission(
             user_id=current_user.id,
-            image_path_url=file_url,
+            image_path_url=upload.url,
             status=SubmissionStatus.PENDING
         )
 
         db.add(submission)
-        db.commit()
+        timed_commit(db, "submission_insert")
         db.refresh(submission)
 
-        # Process with ML models (after file is fully written and closed)
-        try:
-            ml_results = process_with_ml_model(str(file_path))
-
-            submission.classification = ml_results.get("classification")
-            submission.confidence = ml_results.get("confidence")
-            submission.material_type = ml_results.get("material_type")
-            submission.recyclable = ml_results.get("recyclable")
-            submission.resell_value = ml_results.get("resell_value")
-            submission.co2_saved = ml_results.get("co2_saved")
-            submission.resell_places = ml_results.get("resell_places")
-            submission.model_version = ml_results.get("model_version")
-            submission.status = SubmissionStatus.CLASSIFIED
-        
-            db.commit()
-            db.refresh(submission)
+        # Hand off to background workers; fall back to inline processing if the queue is full
+        if async_processing:
+            # duplicate images are answered straight from the result cache, no need to queue
+            if apply_cached_result(db, submission, upload.digest):
+                submission_workers.schedule_renditions(db, submission, upload.key)
+                return submission
+            if submission_workers.enqueue(submission.id, upload.key, upload.digest):
+                response.status_code = status.HTTP_202_ACCEPTED
+                return submission
 
-        except Exception as ml_error:
-            submission.status = SubmissionStatus.FAILED
-            db.commit()
-            db.refresh(submission)
+            # queue full, classify inline like a sync upload
+            inference_admission.acquire()
+            slot_held = True
 
-            print(f"ML processing failed: {ml_error}")
+        # Process with ML models straight from memory (cache hits skip the models)
+        # (async uploads that ended up here did not keep the bytes, read the stored blob)
+        image = upload.data if upload.data is not None else upload.key
+        classify_submission(db, submission, image, digest=upload.digest, check_cache=not async_processing)
+        submission_workers.schedule_renditions(db, submission, upload.key)
 
         return submission
         
     except Exception as e:
-        if file_path.exists():
-            file_path.unlink()
+        # rejected by ingest_upload, nothing was stored
+        if isinstance(e, HTTPException):
+            raise
 
-        # Rollback any database changes instead of trying to delete
+        # Rollback any database changes and drop the half-processed row
+        # (its blobs may be shared, the storage garbage collector removes them if not)
         db.rollback()
+        if submission is not None and submission.id is not None:
+            try:
+                db.delete(submission)
+                db.commit()
+            except Exception:
+                db.rollback()
+
+        if isinstance(e, AdmissionRejected):
+            raise _overloaded(e)
 
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process submission: {str(e)}"
         )
     finally:
+        if slot_held:
+            inference_admission.release()
         file.file.close()
 
+@router.post("/batch", response_model=SubmissionBatchResponse, status_code=status.HTTP_201_CREATED)
+def create_submission_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create several submissions from one multipart upload.
+    Each file is validated on its own; valid files are classified together as
+    tensor batches and all rows are inserted in a single transaction.
+    Per-file failures are reported in the matching item instead of failing the request.
+    With IMAGE_NORMALIZE the WebP renditions are written afterwards, as for single uploads.
+    """
+    if len(files) > settings.SUBMISSION_BATCH_MAX_FILES:
+        for file in files:
+            file.file.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files, at most {settings.SUBMISSION_BATCH_MAX_FILES} per batch"
+        )
+
+    items = [SubmissionBatchItem(filename=file.filename) for file in files]
+
+    # reject before anything is stored
+    try:
+        inference_admission.acquire()
+    except AdmissionRejected as rejected:
+        for file in files:
+            file.file.close()
+        raise _overloaded(rejected)
+
+    try:
+        # (item index, IngestedUpload) for every file that passed validation and is stored
+        accepted = []
+        try:
+            for i, file in enumerate(files):
+                try:
+                    accepted.append((i, ingest_upload(file)))
+                except HTTPException as e:
+                    items[i].error = e.detail
+                except Exception as e:
+                    items[i].error = f"Failed to store file: {e}"
+        finally:
+            for file in files:
+                file.file.close()
+
+        if accepted:
+            try:
+                ml_results_list = classify_uploads(
+                    db, [upload.data for _, upload in accepted], [upload.digest for _, upload in accepted]
+                )
+
+                created = []
+                for (i, upload), ml_results in zip(accepted, ml_results_list):
+                    submission = Submission(
+                        user_id=current_user.id,
+                        image_path_url=upload.url,
+                        status=SubmissionStatus.PENDING
+                    )
+                    if ml_results.get("error"):
+                        submission.status = SubmissionStatus.FAILED
+                        items[i].error = f"Classification failed: {ml_results['error']}"
+                    else:
+                        apply_ml_results(submission, ml_results)
+                    db.add(submission)
+                    created.append((i, submission, upload.key))
+
+                # one INSERT round for every row; server defaults come back via RETURNING,
+                # so responses are built before commit expires the objects
+                db.flush()
+                for i, submission, _ in created:
+                    items[i].submission = SubmissionResponse.model_validate(submission)
+                timed_commit(db, "batch_insert")
+
+                for _, submission, key in created:
+                    if submission.status == SubmissionStatus.CLASSIFIED:
+                        submission_workers.schedule_renditions(db, submission, key)
+
+            except Exception as e:
+                db.rollback()
+
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Failed to process batch: {str(e)}"
+                )
+    finally:
+        inference_admission.release()
+
+    failed = sum(1 for item in items if item.error)
+    return SubmissionBatchResponse(
+        items=items,
+        succeeded=len(items) - failed,
+        failed=failed
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison, W/ prefixes are ignored"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 @router.get("/files/{filename}")
-async def get_submission_file(filename: str):
-    """Serve uploaded submission files"""
-    file_path = TEMP_DIR / filename
+async def get_submission_file(filename: str, request: Request):
+    """
+    Serve uploaded submission files.
+    Blobs are immutable (content-addressed keys), so responses carry a strong
+    ETag and a long-lived immutable Cache-Control, revalidation is answered
+    with 304 without touching storage, and Range requests are supported.
+    """
+    if not is_valid_key(filename):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
     
-    if not file_path.exists():
+    headers = {"Cache-Control": f"public, max-age={settings.FILES_CACHE_MAX_AGE}, immutable"}
+    etag = content_etag(filename)
+    if etag is not None:
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if not await run_in_threadpool(storage.exists, filename):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
         )
     
-    from fastapi.responses import FileResponse
-    return FileResponse(path=file_path)
+    file_path = storage.local_path(filename)
+    if file_path is not None:
+        if settings.FILES_ACCEL_REDIRECT_PREFIX:
+            # nginx sends the file (sendfile, ranges); we only answer with headers
+            headers["X-Accel-Redirect"] = settings.FILES_ACCEL_REDIRECT_PREFIX + shard_path(filename)
+            return Response(headers=headers)
+        # FileResponse handles Range / If-Range and uses http.response.pathsend where the server offers it
+        return FileResponse(path=file_path, headers=headers)
+    
+    # remote backend, proxy the blob (S3 resolves the Range header itself)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers["Accept-Ranges"] = "bytes"
+    http_range = request.headers.get("range")
+    if http_range:
+        try:
+            data, content_range = await run_in_threadpool(storage.get_range, filename, http_range)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable"
+            )
+        if content_range:
+            headers["Content-Range"] = content_range
+            return Response(content=data, status_code=status.HTTP_206_PARTIAL_CONTENT, media_type=media_type, headers=headers)
+        return Response(content=data, media_type=media_type, headers=headers)
+    
+    data = await run_in_threadpool(storage.get, filename)
+    return Response(content=data, media_type=media_type, headers=headers)
 
 
 
 @router.get("/", response_model=SubmissionList)
-def get_submissions(
+async def get_submissions(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     status_filter: Optional[SubmissionStatus] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; switches to keyset pagination"),
+    include_total: Optional[bool] = Query(None, description="Count all matching rows (default: on for page mode, off for cursor mode)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's submissions with pagination"""
+    """
+    Get user's submissions with pagination.
+    Page mode (page/per_page) is kept for compatibility; for deep lists pass
+    the returned next_cursor as cursor, which seeks on (created_at, id)
+    instead of scanning past every skipped row.
+    """
+    use_cursor = cursor is not None
+    if include_total is None:
+        include_total = not use_cursor
     
     # Base query for user's submissions
-    query = db.query(Submission).filter(Submission.user_id == current_user.id)
+    query = select(Submission).where(Submission.user_id == current_user.id)
     
     # Apply status filter if provided
     if status_filter:
-        query = query.filter(Submission.status == status_filter)
+        query = query.where(Submission.status == status_filter)
     
-    # Order by newest first
-    query = query.order_by(desc(Submission.created_at))
+    # Get total count (optional, it re-counts the user's whole history)
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
     
-    # Get total count
-    total = query.count()
+    # Order by newest first, id breaks ties so every row has a stable position
+    query = query.order_by(desc(Submission.created_at), desc(Submission.id))
     
     # Apply pagination
-    offset = (page - 1) * per_page
-    submissions = query.offset(offset).limit(per_page).all()
+    if use_cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(
+            tuple_(Submission.created_at, Submission.id) < tuple_(cursor_created_at, cursor_id)
+        )
+        offset = 0
+    else:
+        offset = (page - 1) * per_page
+        query = query.offset(offset)
+    
+    # One extra row tells us whether there is a next page without counting
+    rows = (await db.scalars(query.limit(per_page + 1))).all()
+    has_next = len(rows) > per_page
+    submissions = rows[:per_page]
+    
+    next_cursor = None
+    if has_next:
+        last = submissions[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
     
     return SubmissionList(
         items=submissions,
         total=total,
-        page=page,
+        page=None if use_cursor else page,
         per_page=per_page,
-        has_next=offset + per_page < total,
-        has_prev=page > 1
+        has_next=has_next,
+        has_prev=use_cursor or page > 1,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{submission_id}", response_model=SubmissionResponse)
-def get_submission(
+async def get_submission(
     submission_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific submission"""
     
-    submission = db.query(Submission).filter(
+    submission = await db.scalar(select(Submission).where(
         Submission.id == submission_id,
-        Submission.user_id == current_user.id  
-    ).first()
+        Submission.user_id == current_user.id
+    ))
     
     if not submission:
         raise HTTPException(
@@ -166,17 +400,21 @@ def get_submission(
     return submission
 
 @router.delete("/{submission_id}")
-def delete_submission(
+async def delete_submission(
     submission_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Delete a submission and its associated file"""
+    """
+    Delete a submission.
+    Its blobs lose a reference; the storage garbage collector removes them
+    once no other submission uses the same image.
+    """
     
-    submission = db.query(Submission).filter(
+    submission = await db.scalar(select(Submission).where(
         Submission.id == submission_id,
         Submission.user_id == current_user.id
-    ).first()
+    ))
     
     if not submission:
         raise HTTPException(
@@ -184,18 +422,7 @@ def delete_submission(
             detail="Submission not found"
         )
     
-    # Try to delete associated file
-    if submission.image_path_url and "/files/" in submission.image_path_url:
-        filename = submission.image_path_url.split("/")[-1]
-        file_path = TEMP_DIR / filename
-        if file_path.exists():
-            try:
-                file_path.unlink()
-            except Exception as e:
-                # Log the error but don't fail the deletion
-                print(f"Failed to delete file {filename}: {e}")
-    
-    db.delete(submission)
-    db.commit()
+    await db.delete(submission)
+    await db.commit()
     
     return {"message": "Submission deleted successfully"}
\ No newline at end of file
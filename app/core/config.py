@@ -11,4 +11,128 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES = 60*24*8 # 8 days
     ALGORITHM = "HS256"
 
-settings = Settings()
\ No newline at end of file
+    # Structured JSON logs; at DEBUG only this fraction of submissions log their trace
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+    # Server-Timing header with per-stage durations on API responses
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+    # Password hashing runs on its own bounded executor (excess logins get 503 + Retry-After)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))  # seconds
+    # Argon2 cost (0 = passlib default); memory cost is in KiB
+    ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "0"))
+    ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "0"))
+    ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "0"))
+
+    # Cache of verified tokens and user rows used by get_current_user
+    AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+    # Database connection pools (applied to both the sync and the async engine)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 = never
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # asyncpg prepared statement cache; set to 0 behind pgbouncer / Neon pooled endpoints
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+    # Blob storage for uploads: local (sharded files under STORAGE_LOCAL_ROOT) | s3
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+    STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "temp")
+    STORAGE_S3_BUCKET = os.getenv("STORAGE_S3_BUCKET", "")
+    STORAGE_S3_PREFIX = os.getenv("STORAGE_S3_PREFIX", "uploads/")
+    STORAGE_S3_ENDPOINT_URL = os.getenv("STORAGE_S3_ENDPOINT_URL", "")  # e.g. http://localhost:9000 for MinIO
+    STORAGE_S3_REGION = os.getenv("STORAGE_S3_REGION", "")
+    # unreferenced blobs younger than this are kept (uploads in flight)
+    STORAGE_GC_GRACE_SECONDS = float(os.getenv("STORAGE_GC_GRACE_SECONDS", "3600"))
+
+    # Serving stored files: blobs never change, so clients and CDNs may cache them for good.
+    # With an accel prefix set, nginx serves local blobs itself (X-Accel-Redirect + sendfile)
+    FILES_CACHE_MAX_AGE = int(os.getenv("FILES_CACHE_MAX_AGE", "31536000"))
+    FILES_ACCEL_REDIRECT_PREFIX = os.getenv("FILES_ACCEL_REDIRECT_PREFIX", "")
+
+    # Uploads are stored as a normalized WebP (metadata stripped, longest side capped)
+    # plus WebP thumbnails with these longest sides. The models classify the normalized
+    # pixels directly; the WebP files are encoded by the submission workers afterwards
+    IMAGE_NORMALIZE = os.getenv("IMAGE_NORMALIZE", "true").lower() == "true"
+    IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+    IMAGE_THUMBNAIL_SIZES = [int(size) for size in os.getenv("IMAGE_THUMBNAIL_SIZES", "160,480").split(",") if size.strip()]
+    IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "82"))
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "50000000"))
+
+    # Inference micro-batching (collects concurrent uploads into one forward pass)
+    INFERENCE_BATCHING_ENABLED = os.getenv("INFERENCE_BATCHING_ENABLED", "true").lower() == "true"
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+    INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+    # Cascade for stage 1: a light classifier (model_light.pt next to the version's weights) answers
+    # first, items below its per-class confidence threshold escalate to model_major.
+    # Thresholds come from `python -m app.utils.calibrate_cascade`, INFERENCE_CASCADE_THRESHOLD is
+    # the fallback and INFERENCE_CASCADE_THRESHOLDS ("hazardous=0.98,organic=0.9") overrides both
+    INFERENCE_CASCADE_ENABLED = os.getenv("INFERENCE_CASCADE_ENABLED", "false").lower() == "true"
+    INFERENCE_CASCADE_LIGHT_ARCH = os.getenv("INFERENCE_CASCADE_LIGHT_ARCH", "mobilenetv3_small_100")
+    INFERENCE_CASCADE_LIGHT_INPUT_SIZE = int(os.getenv("INFERENCE_CASCADE_LIGHT_INPUT_SIZE", "160"))
+    INFERENCE_CASCADE_THRESHOLD = float(os.getenv("INFERENCE_CASCADE_THRESHOLD", "0.9"))
+    INFERENCE_CASCADE_THRESHOLDS = os.getenv("INFERENCE_CASCADE_THRESHOLDS", "")
+
+    # Speculative stage 2: start material detection alongside model 1 while inorganic items are
+    # common (recent share >= MIN_PROBABILITY) and the process's inference load is <= MAX_LOAD (0.0 - 1.0)
+    INFERENCE_SPECULATIVE_ENABLED = os.getenv("INFERENCE_SPECULATIVE_ENABLED", "false").lower() == "true"
+    INFERENCE_SPECULATIVE_WORKERS = int(os.getenv("INFERENCE_SPECULATIVE_WORKERS", "2"))
+    INFERENCE_SPECULATIVE_MIN_PROBABILITY = float(os.getenv("INFERENCE_SPECULATIVE_MIN_PROBABILITY", "0.4"))
+    INFERENCE_SPECULATIVE_MAX_LOAD = float(os.getenv("INFERENCE_SPECULATIVE_MAX_LOAD", "0.5"))
+
+    # Submission processing: "sync" classifies inside the request, "async" returns 202
+    # and leaves classification to the background workers
+    SUBMISSION_PROCESSING_MODE = os.getenv("SUBMISSION_PROCESSING_MODE", "sync").lower()
+    SUBMISSION_WORKERS = int(os.getenv("SUBMISSION_WORKERS", "2"))
+    SUBMISSION_QUEUE_SIZE = int(os.getenv("SUBMISSION_QUEUE_SIZE", "256"))
+    # At startup, re-queue PENDING/PROCESSING submissions untouched for this long (left by a dead process)
+    SUBMISSION_RECOVER_AFTER_SECONDS = int(os.getenv("SUBMISSION_RECOVER_AFTER_SECONDS", "300"))
+    SUBMISSION_BATCH_MAX_FILES = int(os.getenv("SUBMISSION_BATCH_MAX_FILES", "20"))
+
+    # Out-of-process inference pool (0 = run the models inside the API process)
+    INFERENCE_POOL_WORKERS = int(os.getenv("INFERENCE_POOL_WORKERS", "0"))
+    INFERENCE_POOL_CORES_PER_WORKER = int(os.getenv("INFERENCE_POOL_CORES_PER_WORKER", "0"))  # 0 = split evenly
+    INFERENCE_POOL_THREADS_PER_WORKER = int(os.getenv("INFERENCE_POOL_THREADS_PER_WORKER", "2"))
+    INFERENCE_POOL_TIMEOUT = float(os.getenv("INFERENCE_POOL_TIMEOUT", "60"))
+
+    # Classification result cache keyed by content hash + model version (TTL applies to both tiers)
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+
+    # Inference backend for both models: eager | torchscript | onnx
+    # (non-eager backends need `python -m app.utils.export_models` to have been run)
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager").lower()
+
+    # Inference precision: fp32 | int8 | int8-dynamic | bf16 | fp16 (see utils/precision.py)
+    INFERENCE_PRECISION = os.getenv("INFERENCE_PRECISION", "fp32").lower()
+
+    # Model registry: one folder per version under MODEL_REGISTRY_DIR (see utils/model_registry.py).
+    # MODEL_ACTIVE_VERSION forces the version used at startup, otherwise the last activated one
+    MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "app/utils/models")
+    MODEL_ACTIVE_VERSION = os.getenv("MODEL_ACTIVE_VERSION", "")
+    MODEL_KEEP_PREVIOUS = os.getenv("MODEL_KEEP_PREVIOUS", "true").lower() == "true"  # instant rollback, 2x memory
+    MODEL_DRAIN_TIMEOUT = float(os.getenv("MODEL_DRAIN_TIMEOUT", "60"))
+    MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "5"))
+
+    # Benchmarking only: skip loading the models and answer with a deterministic fake result
+    # after INFERENCE_STUB_LATENCY_MS, so load tests measure API + DB overhead alone
+    INFERENCE_STUB_MODELS = os.getenv("INFERENCE_STUB_MODELS", "false").lower() == "true"
+    INFERENCE_STUB_LATENCY_MS = float(os.getenv("INFERENCE_STUB_LATENCY_MS", "0"))
+
+    # Admission control: bounded inference concurrency + bounded wait queue
+    INFERENCE_MAX_CONCURRENCY = int(os.getenv("INFERENCE_MAX_CONCURRENCY", "4"))
+    INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "16"))
+    INFERENCE_QUEUE_TIMEOUT = float(os.getenv("INFERENCE_QUEUE_TIMEOUT", "10"))
+    INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "5"))  # seconds
+    # torch thread budgets (0 = torch default)
+    TORCH_INTRA_OP_THREADS = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+    TORCH_INTER_OP_THREADS = int(os.getenv("TORCH_INTER_OP_THREADS", "0"))
+
+settings = Settings()
@@ -0,0 +1,80 @@
+"""
+Structured logging.
+
+Every record is one JSON line on stderr; fields passed with extra={...} are
+included as keys. The level comes from LOG_LEVEL (INFO keeps the inference
+path silent). At DEBUG, LOG_DEBUG_SAMPLE_RATE decides which submissions get
+their debug trace: the decision is made once per trace (see start_trace)
+so a sampled submission logs all of its steps and the rest log none.
+"""
+import contextvars
+import json
+import logging
+import random
+import sys
+
+from app.core.config import settings
+
+# standard LogRecord attributes, everything else on a record came from extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_trace_sampled: contextvars.ContextVar = contextvars.ContextVar("trace_sampled", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Drop DEBUG records outside sampled traces; other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        sampled = _trace_sampled.get()
+        if sampled is None:
+            # not inside a trace (e.g. a batcher thread), sample per record
+            return random.random() < self.rate
+        return sampled
+
+
+def start_trace() -> bool:
+    """Decide whether the current unit of work emits its debug records"""
+    sampled = random.random() < settings.LOG_DEBUG_SAMPLE_RATE
+    _trace_sampled.set(sampled)
+    return sampled
+
+
+def configure_logging() -> None:
+    """Install the JSON handler on the root logger (call once per process)"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    # the app's own loggers follow LOG_LEVEL, libraries stay at WARNING unless asked
+    if settings.LOG_LEVEL == "DEBUG":
+        for name in ("sqlalchemy", "PIL", "urllib3", "botocore", "multipart"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
@@ -4,13 +4,31 @@ from typing import Any, Union
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from passlib.hash import argon2
 
 from app.core.config import settings
 
+# argon2 cost parameters; unset (0) ones keep the passlib defaults.
+# Hashes made with other parameters are upgraded on the next successful login.
+_argon2_params = {
+    f"argon2__{name}": value
+    for name, value in (
+        ("time_cost", settings.ARGON2_TIME_COST),
+        ("memory_cost", settings.ARGON2_MEMORY_COST),
+        ("parallelism", settings.ARGON2_PARALLELISM),
+    )
+    if value > 0
+}
+if settings.ARGON2_TIME_COST > 0:
+    # passlib only flags time_cost (its "rounds") as outdated against min/max desired rounds
+    _argon2_params["argon2__min_rounds"] = settings.ARGON2_TIME_COST
+    _argon2_params["argon2__max_rounds"] = settings.ARGON2_TIME_COST
+
 # argon2 has no byte limitations
 pwd_context = CryptContext(
     schemes=["argon2", "bcrypt"], 
     deprecated="auto",
+    **_argon2_params,
 )
 
 def validate_password_strength(password: str) -> tuple[bool, str]:
@@ -36,6 +54,22 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
+def _parallelism_outdated(hashed_password: str) -> bool:
+    """passlib never compares argon2 parallelism, so check the stored hash ourselves"""
+    if settings.ARGON2_PARALLELISM <= 0 or not argon2.identify(hashed_password):
+        return False
+    return argon2.from_string(hashed_password).parallelism != settings.ARGON2_PARALLELISM
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify a password; also returns a new hash if the stored one uses outdated parameters."""
+    try:
+        verified, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+        if verified and new_hash is None and _parallelism_outdated(hashed_password):
+            new_hash = pwd_context.hash(plain_password)
+        return verified, new_hash
+    except Exception:
+        return False, None
+
 def get_password_hash(password: str) -> str:
     """Hash a password using Argon2."""
     return pwd_context.hash(password)
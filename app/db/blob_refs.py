@@ -0,0 +1,180 @@
+"""
+Reference counts for stored blobs, and garbage collection of unused ones.
+
+A before_flush hook turns every inserted / deleted submission (and every
+change to its urls) into +1 / -1 on the storage_blobs rows of the blobs it
+points at, inside the same transaction. Counts can drift when rows go away
+without the ORM (ON DELETE CASCADE from users), and blobs can be written
+for a transaction that then rolls back; the collector fixes both:
+
+    python -m app.db.blob_refs --verify   # report drifted counts and unreferenced blobs
+    python -m app.db.blob_refs --gc       # reconcile counts, delete unreferenced blobs
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.storage_blob import StorageBlob
+from app.models.submission import Submission
+from app.utils.storage import key_from_url
+
+
+def blob_keys(image_path_url, thumbnail_urls) -> list:
+    """Keys of every blob a submission references"""
+    urls = [image_path_url, *(thumbnail_urls or {}).values()]
+    return [key_from_url(url) for url in urls if url]
+
+
+def _previous_keys(submission: Submission) -> list:
+    state = inspect(submission)
+    values = []
+    for name in ("image_path_url", "thumbnail_urls"):
+        history = state.attrs[name].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.added and not history.unchanged:
+            values.append(None)
+        else:
+            values.append(getattr(submission, name))
+    return blob_keys(*values)
+
+
+def _collect_ref_deltas(session: Session) -> Counter:
+    deltas = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Submission):
+            deltas.update(blob_keys(obj.image_path_url, obj.thumbnail_urls))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Submission) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if not (state.attrs.image_path_url.history.has_changes() or state.attrs.thumbnail_urls.history.has_changes()):
+            continue
+        deltas.subtract(_previous_keys(obj))
+        deltas.update(blob_keys(obj.image_path_url, obj.thumbnail_urls))
+
+    for obj in session.deleted:
+        if isinstance(obj, Submission):
+            deltas.subtract(_previous_keys(obj))
+
+    return Counter({key: delta for key, delta in deltas.items() if delta != 0})
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_blob_refs(session: Session, flush_context, instances) -> None:
+    deltas = _collect_ref_deltas(session)
+    if not deltas:
+        return
+
+    stmt = insert(StorageBlob).values([
+        {"key": key, "ref_count": delta} for key, delta in sorted(deltas.items())
+    ])
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[StorageBlob.key],
+            set_={
+                "ref_count": StorageBlob.ref_count + stmt.excluded.ref_count,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+# ============================================
+# RECONCILE / GARBAGE COLLECTION
+# ============================================
+
+def expected_ref_counts(db: Session) -> Counter:
+    """Reference counts recomputed from the submissions table"""
+    counts = Counter()
+    rows = db.execute(select(Submission.image_path_url, Submission.thumbnail_urls)).yield_per(1000)
+    for image_path_url, thumbnail_urls in rows:
+        counts.update(blob_keys(image_path_url, thumbnail_urls))
+    return counts
+
+
+def reconcile_ref_counts(db: Session, expected: Counter, dry_run: bool = False) -> int:
+    """Rewrite drifted storage_blobs rows. Returns the number of drifted rows."""
+    actual = {row.key: row.ref_count for row in db.query(StorageBlob).all()}
+    drifted = 0
+    for key in set(expected) | set(actual):
+        want = expected.get(key, 0)
+        if actual.get(key) == want:
+            continue
+        drifted += 1
+        if dry_run:
+            continue
+        if want == 0:
+            db.query(StorageBlob).filter(StorageBlob.key == key).delete()
+        else:
+            db.merge(StorageBlob(key=key, ref_count=want))
+    if not dry_run:
+        db.commit()
+    return drifted
+
+
+def collect_garbage(db: Session, blob_store, grace_seconds: float, dry_run: bool = False) -> dict:
+    """
+    Delete blobs no submission references, reconciling the counts on the way.
+    Blobs younger than grace_seconds are kept: an upload writes its blob
+    before the submission row commits.
+    """
+    expected = expected_ref_counts(db)
+    drifted = reconcile_ref_counts(db, expected, dry_run=dry_run)
+
+    cutoff = time.time() - grace_seconds
+    kept = deleted = too_new = 0
+    for key, modified_at in blob_store.iter_blobs():
+        if expected.get(key, 0) > 0:
+            kept += 1
+        elif modified_at > cutoff:
+            too_new += 1
+        else:
+            deleted += 1
+            if not dry_run:
+                blob_store.delete(key)
+
+    return {
+        "referenced": kept,
+        "unreferenced": deleted,
+        "unreferenced_in_grace": too_new,
+        "drifted_counts": drifted,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--verify", action="store_true", help="Report only, change nothing")
+    group.add_argument("--gc", action="store_true", help="Reconcile counts and delete unreferenced blobs")
+    parser.add_argument("--grace-seconds", type=float, default=settings.STORAGE_GC_GRACE_SECONDS)
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    from app.utils.storage import storage
+
+    db = SessionLocal()
+    try:
+        report = collect_garbage(db, storage, args.grace_seconds, dry_run=args.verify)
+    finally:
+        db.close()
+
+    action = "would delete" if args.verify else "deleted"
+    print(f"{report['referenced']} referenced blobs, {action} {report['unreferenced']} unreferenced, "
+          f"{report['unreferenced_in_grace']} unreferenced within the grace period")
+    print(f"storage_blobs: {report['drifted_counts']} counts drifted")
+    if args.verify:
+        return 1 if report["unreferenced"] or report["drifted_counts"] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Incrementally maintained stats rollups.
+
+A before_flush hook turns every change to a submission's CLASSIFIED state
+(new classified row, status change, delete) into deltas on user_stats and
+user_daily_stats, and applies them with upserts inside the same transaction
+as the change itself.
+
+Rebuild / verify against the submissions table:
+    python -m app.db.rollups --verify
+    python -m app.db.rollups --rebuild
+"""
+import argparse
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timezone
+from decimal import Decimal
+
+from sqlalchemy import Date, case, cast, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.submission import Submission, SubmissionStatus
+from app.models.user_stats import UserDailyStats, UserStats
+
+
+@dataclass
+class StatsDelta:
+    item_count: int = 0
+    recyclable_count: int = 0
+    co2_total: float = 0.0
+    revenue_total: Decimal = Decimal("0")
+
+    def add(self, values: dict, sign: int) -> None:
+        self.item_count += sign
+        self.recyclable_count += sign if values["recyclable"] is True else 0
+        self.co2_total += sign * float(values["co2_saved"] or 0.0)
+        self.revenue_total += sign * Decimal(str(values["resell_value"] or 0))
+
+    def is_empty(self) -> bool:
+        return (
+            self.item_count == 0
+            and self.recyclable_count == 0
+            and self.co2_total == 0.0
+            and self.revenue_total == 0
+        )
+
+
+_TRACKED = (
+    "status", "user_id", "recyclable", "co2_saved", "resell_value",
+    "classification", "material_type", "created_at",
+)
+
+
+def _state(submission: Submission, previous: bool) -> dict:
+    """Current values, or the values as last loaded from the database"""
+    values = {}
+    state = inspect(submission)
+    for name in _TRACKED:
+        if previous:
+            history = state.attrs[name].history
+            if history.deleted:
+                values[name] = history.deleted[0]
+                continue
+            if history.added and not history.unchanged:
+                # attribute was never loaded before being set
+                values[name] = None
+                continue
+        values[name] = getattr(submission, name)
+    return values
+
+
+def _collect_changes(session: Session) -> list:
+    """(sign, values) for every classified submission entering or leaving the totals"""
+    changes = []
+
+    for obj in session.new:
+        if isinstance(obj, Submission) and obj.status == SubmissionStatus.CLASSIFIED:
+            changes.append((+1, _state(obj, previous=False)))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Submission) or not session.is_modified(obj):
+            continue
+        before = _state(obj, previous=True)
+        after = _state(obj, previous=False)
+        if before["status"] == SubmissionStatus.CLASSIFIED:
+            changes.append((-1, before))
+        if after["status"] == SubmissionStatus.CLASSIFIED:
+            changes.append((+1, after))
+
+    for obj in session.deleted:
+        if isinstance(obj, Submission):
+            before = _state(obj, previous=True)
+            if before["status"] == SubmissionStatus.CLASSIFIED:
+                changes.append((-1, before))
+
+    return [(sign, values) for sign, values in changes if values["user_id"] is not None]
+
+
+def material_key(classification, material_type) -> str:
+    """Bucket used for per-material counts: detected material, else the top-level class"""
+    return material_type or classification or "unknown"
+
+
+def _day_of(values: dict) -> date | None:
+    """UTC day of the submission, None for rows that are being inserted by this flush"""
+    created_at = values["created_at"]
+    if created_at is None:
+        return None
+    return created_at.astimezone(timezone.utc).date()
+
+
+def _collect_deltas(changes: list) -> tuple[dict, dict]:
+    """Aggregate changes per user and per (user, day, material)"""
+    totals: dict = defaultdict(StatsDelta)
+    daily: dict = defaultdict(StatsDelta)
+
+    for sign, values in changes:
+        totals[values["user_id"]].add(values, sign)
+        key = (values["user_id"], _day_of(values), material_key(values["classification"], values["material_type"]))
+        daily[key].add(values, sign)
+
+    totals = {k: d for k, d in totals.items() if not d.is_empty()}
+    daily = {k: d for k, d in daily.items() if not d.is_empty()}
+    return totals, daily
+
+
+def _apply_user_stats(session: Session, user_id, delta: StatsDelta) -> None:
+    stmt = insert(UserStats).values(
+        user_id=user_id,
+        item_count=delta.item_count,
+        recyclable_count=delta.recyclable_count,
+        co2_total=delta.co2_total,
+        revenue_total=delta.revenue_total,
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserStats.user_id],
+            set_={
+                "item_count": UserStats.item_count + stmt.excluded.item_count,
+                "recyclable_count": UserStats.recyclable_count + stmt.excluded.recyclable_count,
+                "co2_total": UserStats.co2_total + stmt.excluded.co2_total,
+                "revenue_total": UserStats.revenue_total + stmt.excluded.revenue_total,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def _apply_daily_stats(session: Session, user_id, day: date | None, material: str, delta: StatsDelta) -> None:
+    if day is None:
+        # new rows get created_at = now() in this same transaction
+        day = cast(func.timezone("UTC", func.now()), Date)
+    stmt = insert(UserDailyStats).values(
+        user_id=user_id,
+        day=day,
+        material=material,
+        item_count=delta.item_count,
+        recyclable_count=delta.recyclable_count,
+        co2_total=delta.co2_total,
+        revenue_total=delta.revenue_total,
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserDailyStats.user_id, UserDailyStats.day, UserDailyStats.material],
+            set_={
+                "item_count": UserDailyStats.item_count + stmt.excluded.item_count,
+                "recyclable_count": UserDailyStats.recyclable_count + stmt.excluded.recyclable_count,
+                "co2_total": UserDailyStats.co2_total + stmt.excluded.co2_total,
+                "revenue_total": UserDailyStats.revenue_total + stmt.excluded.revenue_total,
+            },
+        )
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_rollups(session: Session, flush_context, instances) -> None:
+    changes = _collect_changes(session)
+    if not changes:
+        return
+
+    totals, daily = _collect_deltas(changes)
+    for user_id, delta in totals.items():
+        _apply_user_stats(session, user_id, delta)
+    for (user_id, day, material), delta in daily.items():
+        _apply_daily_stats(session, user_id, day, material, delta)
+
+
+# ============================================
+# REBUILD / VERIFY
+# ============================================
+
+def _expected_user_stats(db: Session) -> dict:
+    """Rollup values recomputed from the submissions table"""
+    rows = db.execute(
+        select(
+            Submission.user_id,
+            func.count(Submission.id),
+            func.count(case((Submission.recyclable.is_(True), 1))),
+            func.coalesce(func.sum(Submission.co2_saved), 0.0),
+            func.coalesce(func.sum(Submission.resell_value), 0),
+        )
+        .where(Submission.status == SubmissionStatus.CLASSIFIED)
+        .group_by(Submission.user_id)
+    ).all()
+    return {
+        user_id: (items, recyclable, float(co2), Decimal(revenue))
+        for user_id, items, recyclable, co2, revenue in rows
+    }
+
+
+def verify_user_stats(db: Session) -> list:
+    """Users whose rollup row does not match their submissions"""
+    expected = _expected_user_stats(db)
+    actual = {
+        row.user_id: (row.item_count, row.recyclable_count, float(row.co2_total), Decimal(row.revenue_total))
+        for row in db.query(UserStats).all()
+    }
+
+    drift = []
+    for user_id in set(expected) | set(actual):
+        want = expected.get(user_id, (0, 0, 0.0, Decimal("0")))
+        have = actual.get(user_id, (0, 0, 0.0, Decimal("0")))
+        if want[:2] != have[:2] or abs(want[2] - have[2]) > 1e-6 or want[3] != have[3]:
+            drift.append((user_id, have, want))
+    return drift
+
+
+def rebuild_user_stats(db: Session) -> int:
+    """Recompute every rollup row from scratch. Returns the number of rows written."""
+    expected = _expected_user_stats(db)
+    db.query(UserStats).delete()
+    for user_id, (items, recyclable, co2, revenue) in expected.items():
+        db.add(UserStats(
+            user_id=user_id,
+            item_count=items,
+            recyclable_count=recyclable,
+            co2_total=co2,
+            revenue_total=revenue,
+        ))
+    db.commit()
+    return len(expected)
+
+
+def _expected_daily_stats(db: Session) -> dict:
+    """Daily rollup values recomputed from the submissions table"""
+    day = cast(func.timezone("UTC", Submission.created_at), Date)
+    material = func.coalesce(Submission.material_type, Submission.classification, "unknown")
+    rows = db.execute(
+        select(
+            Submission.user_id,
+            day,
+            material,
+            func.count(Submission.id),
+            func.count(case((Submission.recyclable.is_(True), 1))),
+            func.coalesce(func.sum(Submission.co2_saved), 0.0),
+            func.coalesce(func.sum(Submission.resell_value), 0),
+        )
+        .where(Submission.status == SubmissionStatus.CLASSIFIED)
+        .group_by(Submission.user_id, day, material)
+    ).all()
+    return {
+        (user_id, row_day, row_material): (items, recyclable, float(co2), Decimal(revenue))
+        for user_id, row_day, row_material, items, recyclable, co2, revenue in rows
+    }
+
+
+def verify_daily_stats(db: Session) -> list:
+    """(user, day, material) rows that do not match their submissions"""
+    expected = _expected_daily_stats(db)
+    actual = {
+        (row.user_id, row.day, row.material): (
+            row.item_count, row.recyclable_count, float(row.co2_total), Decimal(row.revenue_total)
+        )
+        for row in db.query(UserDailyStats).all()
+    }
+
+    drift = []
+    for key in set(expected) | set(actual):
+        want = expected.get(key, (0, 0, 0.0, Decimal("0")))
+        have = actual.get(key, (0, 0, 0.0, Decimal("0")))
+        if want[:2] != have[:2] or abs(want[2] - have[2]) > 1e-6 or want[3] != have[3]:
+            drift.append((key, have, want))
+    return drift
+
+
+def rebuild_daily_stats(db: Session) -> int:
+    """Recompute every daily rollup row from scratch. Returns the number of rows written."""
+    expected = _expected_daily_stats(db)
+    db.query(UserDailyStats).delete()
+    for (user_id, day, material), (items, recyclable, co2, revenue) in expected.items():
+        db.add(UserDailyStats(
+            user_id=user_id,
+            day=day,
+            material=material,
+            item_count=items,
+            recyclable_count=recyclable,
+            co2_total=co2,
+            revenue_total=revenue,
+        ))
+    db.commit()
+    return len(expected)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--verify", action="store_true", help="Report rollup rows that drifted")
+    group.add_argument("--rebuild", action="store_true", help="Recompute all rollup rows")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            print(f"Rebuilt user_stats for {rebuild_user_stats(db)} users")
+            print(f"Rebuilt user_daily_stats with {rebuild_daily_stats(db)} rows")
+            return 0
+
+        drift = verify_user_stats(db)
+        for user_id, have, want in drift:
+            print(f"DRIFT user {user_id}: stored={have} expected={want}")
+        print(f"user_stats: {len(drift)} users drifted")
+
+        daily_drift = verify_daily_stats(db)
+        for key, have, want in daily_drift:
+            print(f"DRIFT daily {key}: stored={have} expected={want}")
+        print(f"user_daily_stats: {len(daily_drift)} rows drifted")
+        return 1 if drift or daily_drift else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,64 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.core.config import settings
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DB_URL")
 if not DATABASE_URL:
     raise RuntimeError("DB_URL is not set. Define it in environment or use python-dotenv to load a .env file.")
 
-engine = create_engine(DATABASE_URL)
+# registers the before_flush hook that keeps stats rollups in sync
+# (AsyncSession flushes through a sync Session, so the hook covers both engines)
+import app.db.rollups  # noqa: E402,F401
+# same for the storage_blobs reference counts
+import app.db.blob_refs  # noqa: E402,F401
+
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+
+def _async_url(url: str):
+    """
+    Same database through asyncpg. libpq-only query parameters are not
+    understood by asyncpg, so sslmode becomes its ssl argument.
+    """
+    url = make_url(url)
+    query = dict(url.query)
+    connect_args = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = sslmode
+    query.pop("channel_binding", None)
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+# Sync engine: background workers, CLIs and the inference-bound upload routes
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
 SessionLocal = sessionmaker(bind=engine)
 
+# Async engine: request handlers that only wait on the database
+ASYNC_DATABASE_URL, _async_connect_args = _async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=_async_connect_args, **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally: 
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,16 +1,19 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.core import security
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.models.user import User
+from app.utils.principal_cache import principal_cache
 
 security_scheme = HTTPBearer()
 
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Extract and validate user from JWT token."""
     
@@ -25,22 +28,33 @@ async def get_current_user(
     if not token:
         raise credentials_exception
 
-    try:
-        is_valid, payload = security.verify_token(token)
-        if not is_valid or not payload:
-            raise credentials_exception # auth not found
-            
-        username: str = payload.get("sub") #username is the subject
-        if username is None:
+    username = principal_cache.get_subject(token)
+    if username is None:
+        try:
+            is_valid, payload = security.verify_token(token)
+            if not is_valid or not payload:
+                raise credentials_exception # auth not found
+                
+            username: str = payload.get("sub") #username is the subject
+            if username is None:
+                raise credentials_exception
+                
+        except Exception:
             raise credentials_exception
-            
-    except Exception:
-        raise credentials_exception
+        principal_cache.remember_token(token, username, payload.get("exp"))
+    
+    cached = principal_cache.get_user(username)
+    if cached is not None:
+        # attach a copy to this request's session without a round-trip
+        user = User(**cached)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
     
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
     if user is None:
         raise credentials_exception
     
+    principal_cache.remember_user(user)
     return user
 
 async def get_admin_user(
@@ -1,10 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.api import router as api_router
+from app.api.routes import metrics
+from app.core.config import settings
+from app.core.log import configure_logging, get_logger
+from app.db.session import async_engine
+from app.utils.admission import configure_torch_threads
+from app.utils.file_upload_validation import MAX_FILE_SIZE, MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+from app.utils.inference_pool import inference_pool
+from app.utils.metrics import RequestMetricsMiddleware, ServerTimingMiddleware
+from app.utils.ml_core_logic import load_models
+from app.utils.submission_worker import submission_workers
+
+configure_logging()
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_torch_threads()
+    # model processes (no-op unless INFERENCE_POOL_WORKERS > 0),
+    # otherwise load the models in this process before taking traffic
+    if inference_pool.enabled:
+        inference_pool.start()
+    else:
+        await run_in_threadpool(load_models)
+    # background classification for async submissions
+    submission_workers.start()
+    try:
+        submission_workers.recover_pending()
+    except Exception as e:
+        logger.warning("Could not re-queue pending submissions", extra={"error": str(e)})
+    yield
+    submission_workers.stop()
+    inference_pool.stop()
+    await async_engine.dispose()
+
 
-app = FastAPI(title="trashos-api")
+app = FastAPI(title="trashos-api", lifespan=lifespan)
+
+# refuse oversized uploads from their Content-Length, before the body is spooled
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/submissions/": MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/api/submissions/batch": settings.SUBMISSION_BATCH_MAX_FILES * (MAX_FILE_SIZE + MULTIPART_OVERHEAD),
+    },
+)
 
 # cors will be the end of me
+# (added last so it also wraps the 413s above)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], # CHANGE IN PROD!!  
@@ -13,7 +61,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# per-stage breakdown for the client (decode, model1, model2, db, ...)
+app.add_middleware(ServerTimingMiddleware)
+
+# per-route latency (outermost, so it includes everything below)
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(api_router, prefix="/api")
+app.include_router(metrics.router)
 
 @app.get('/') 
 def root():
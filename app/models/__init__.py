@@ -3,5 +3,11 @@
 
 from app.models.user import User, RoleEnum
 from app.models.submission import Submission, SubmissionStatus
+from app.models.classification_cache import ClassificationCache
+from app.models.user_stats import UserStats, UserDailyStats
+from app.models.storage_blob import StorageBlob
 
-__all__ = ["User", "RoleEnum", "Submission", "SubmissionStatus"]
\ No newline at end of file
+__all__ = [
+    "User", "RoleEnum", "Submission", "SubmissionStatus",
+    "ClassificationCache", "UserStats", "UserDailyStats", "StorageBlob",
+]
\ No newline at end of file
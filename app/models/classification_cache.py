@@ -0,0 +1,35 @@
+from sqlalchemy import String, JSON, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+from app.models.mixins import TimestampMixin
+
+
+class ClassificationCache(Base, TimestampMixin):
+    """Persistent tier of the classification result cache (see utils/result_cache.py)"""
+    __tablename__ = "classification_cache"
+
+    # sha256 of the uploaded bytes
+    content_hash: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True
+    )
+
+    model_version: Mapped[str] = mapped_column(
+        String(50),
+        primary_key=True
+    )
+
+    result: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False
+    )
+
+    hit_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<ClassificationCache(content_hash={self.content_hash}, model_version={self.model_version})>"
@@ -0,0 +1,29 @@
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+from app.models.mixins import TimestampMixin
+
+
+class StorageBlob(Base, TimestampMixin):
+    """
+    Reference count of a stored blob (see utils/storage.py), maintained in the
+    same transaction that inserts or deletes the submissions using it
+    (see app/db/blob_refs.py)
+    """
+    __tablename__ = "storage_blobs"
+
+    # sha256 + extension for content-addressed blobs, the uuid file name for older uploads
+    key: Mapped[str] = mapped_column(
+        String(255),
+        primary_key=True
+    )
+
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<StorageBlob(key={self.key}, ref_count={self.ref_count})>"
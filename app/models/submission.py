@@ -2,7 +2,7 @@ import uuid
 from decimal import Decimal
 from enum import Enum
 from typing import Optional
-from sqlalchemy import Boolean, String, UUID, Enum as SQLEnum, Numeric, Float, ForeignKey, JSON, Text
+from sqlalchemy import Boolean, String, UUID, Enum as SQLEnum, Numeric, Float, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 from app.models.mixins import TimestampMixin
@@ -11,12 +11,18 @@ from app.models.user import User
 
 class SubmissionStatus(Enum):
     PENDING = "pending"
+    PROCESSING = "processing"  # claimed by a background worker
     CLASSIFIED = "classified" 
     FAILED = "failed"
 
 
 class Submission(Base, TimestampMixin):
     __tablename__ = "submissions"
+    __table_args__ = (
+        # keyset pagination: newest first per user, optionally filtered by status
+        Index("ix_submissions_user_status_created_id", "user_id", "status", "created_at", "id"),
+        Index("ix_submissions_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -28,23 +34,26 @@ class Submission(Base, TimestampMixin):
     user_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
 
+    # (active_history on blob references so app/db/blob_refs.py always sees the old value)
     image_path_url: Mapped[str] = mapped_column(
         Text,
-        nullable=False
+        nullable=False,
+        active_history=True
     )
 
     resell_value: Mapped[Optional[Decimal]] = mapped_column(
         Numeric(precision=10, scale=2),
-        nullable=True
+        nullable=True,
+        active_history=True
     )
 
     classification: Mapped[Optional[str]] = mapped_column(
         String(255),
-        nullable=True
+        nullable=True,
+        active_history=True
     )
 
     confidence: Mapped[Optional[float]] = mapped_column(
@@ -54,17 +63,20 @@ class Submission(Base, TimestampMixin):
 
     material_type: Mapped[Optional[str]] = mapped_column(
         String(255),
-        nullable=True
+        nullable=True,
+        active_history=True
     )
 
     recyclable: Mapped[Optional[bool]] = mapped_column(
         Boolean,
-        nullable=True
+        nullable=True,
+        active_history=True
     )
 
     co2_saved: Mapped[Optional[float]] = mapped_column(
         Float,  # grams of CO2 saved
-        nullable=True
+        nullable=True,
+        active_history=True
     )
 
     resell_places: Mapped[Optional[list]] = mapped_column(
@@ -72,6 +84,13 @@ class Submission(Base, TimestampMixin):
         nullable=True
     )
 
+    # {longest side: url} of the WebP thumbnails (written by the submission workers)
+    thumbnail_urls: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True,
+        active_history=True
+    )
+
     # ML Model tracking
     model_version: Mapped[Optional[str]] = mapped_column(
         String(50),
@@ -79,11 +98,13 @@ class Submission(Base, TimestampMixin):
     )
 
     # Processing status
+    # (active_history on rollup inputs so app/db/rollups.py always sees the old value)
     status: Mapped[SubmissionStatus] = mapped_column(
         SQLEnum(SubmissionStatus),
         default=SubmissionStatus.PENDING,
         nullable=False,
-        index=True
+        index=True,
+        active_history=True
     )
 
     # Relationship to User (optional, for easier querying)
@@ -0,0 +1,108 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import UUID, Date, Integer, Float, Numeric, String, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+from app.models.mixins import TimestampMixin
+
+
+class UserStats(Base, TimestampMixin):
+    """
+    Per-user rollup of CLASSIFIED submissions, maintained in the same
+    transaction that classifies or deletes a submission (see app/db/rollups.py)
+    """
+    __tablename__ = "user_stats"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    item_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
+    recyclable_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
+    co2_total: Mapped[float] = mapped_column(
+        Float,  # grams of CO2 saved
+        default=0.0,
+        server_default="0",
+        nullable=False
+    )
+
+    revenue_total: Mapped[Decimal] = mapped_column(
+        Numeric(precision=14, scale=2),
+        default=Decimal("0"),
+        server_default="0",
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<UserStats(user_id={self.user_id}, item_count={self.item_count})>"
+
+
+class UserDailyStats(Base):
+    """
+    Per-user, per-day, per-material rollup of CLASSIFIED submissions.
+    day is the UTC date of the submission's created_at; material is the
+    detected material type, or the top-level class when there is none.
+    """
+    __tablename__ = "user_daily_stats"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    day: Mapped[date] = mapped_column(
+        Date,
+        primary_key=True
+    )
+
+    material: Mapped[str] = mapped_column(
+        String(255),
+        primary_key=True
+    )
+
+    item_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
+    recyclable_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
+    co2_total: Mapped[float] = mapped_column(
+        Float,  # grams of CO2 saved
+        default=0.0,
+        server_default="0",
+        nullable=False
+    )
+
+    revenue_total: Mapped[Decimal] = mapped_column(
+        Numeric(precision=14, scale=2),
+        default=Decimal("0"),
+        server_default="0",
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<UserDailyStats(user_id={self.user_id}, day={self.day}, material={self.material})>"
@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import date
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
 
 
 class UserStatsResponse(BaseModel):
@@ -22,3 +25,21 @@ class ImpactStatsResponse(BaseModel):
     co2Averted: float
     earned: float
     treesSaved: float
+
+
+class SeriesBucket(BaseModel):
+    """One day/week/month bucket of the activity series"""
+    start: date
+    items: int = 0
+    recycledItems: int = 0
+    co2Averted: float = 0.0
+    earned: float = 0.0
+    materials: Dict[str, int] = Field(default_factory=dict)
+
+
+class SeriesStatsResponse(BaseModel):
+    """Schema for activity series (statistics page charts)"""
+    granularity: str
+    start: date
+    end: date
+    buckets: List[SeriesBucket]
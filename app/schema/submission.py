@@ -1,6 +1,6 @@
 import uuid
 from decimal import Decimal
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from pydantic import BaseModel, Field, field_validator
 from app.models.submission import SubmissionStatus
@@ -26,6 +26,7 @@ class SubmissionResponse(BaseModel):
     id: uuid.UUID
     user_id: uuid.UUID
     image_path_url: str
+    thumbnail_urls: Optional[Dict[str, str]] = None  # longest side in px -> url
     classification: Optional[str] = None
     confidence: Optional[float] = None
     material_type: Optional[str] = None
@@ -47,8 +48,24 @@ class SubmissionResponse(BaseModel):
 class SubmissionList(BaseModel):
     """Schema for listing submissions with pagination"""
     items: List[SubmissionResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # only when include_total
+    page: Optional[int] = None  # page mode only
     per_page: int
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+    next_cursor: Optional[str] = None
+
+
+# batch upload
+class SubmissionBatchItem(BaseModel):
+    """Outcome for one file of a batch upload"""
+    filename: Optional[str] = None
+    submission: Optional[SubmissionResponse] = None
+    error: Optional[str] = None
+
+
+class SubmissionBatchResponse(BaseModel):
+    """Schema for batch upload results, one item per uploaded file in order"""
+    items: List[SubmissionBatchItem]
+    succeeded: int
+    failed: int
\ No newline at end of file
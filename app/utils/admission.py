@@ -0,0 +1,129 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when the inference wait queue is full or the wait timed out"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds how many callers run inference at once.
+
+    Up to max_concurrent callers hold a slot; up to max_queue more may wait
+    for one (at most queue_timeout seconds). Anyone beyond that is rejected
+    immediately so the API can answer with 429/503 + Retry-After instead of
+    piling threads onto torch and oversubscribing the cores.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._slots = threading.Semaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self._admitted = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._wait_total = 0.0
+
+    @contextmanager
+    def slot(self):
+        """Hold an inference slot for the duration of the block"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        # fast path: a slot is free, no queueing
+        if self._slots.acquire(blocking=False):
+            self._admitted_now(0.0)
+            return
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._rejected_full += 1
+                raise AdmissionRejected("Inference queue is full", self.retry_after)
+            self._waiting += 1
+
+        started = time.perf_counter()
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        if not acquired:
+            with self._lock:
+                self._rejected_timeout += 1
+            raise AdmissionRejected("Timed out waiting for an inference slot", self.retry_after)
+        self._admitted_now(time.perf_counter() - started)
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def _admitted_now(self, waited: float) -> None:
+        with self._lock:
+            self._active += 1
+            self._admitted += 1
+            self._wait_total += waited
+
+    @property
+    def load(self) -> float:
+        """Fraction of inference slots in use (0.0 - 1.0)"""
+        with self._lock:
+            return self._active / self.max_concurrent
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queue_depth": self._waiting,
+                "admitted": self._admitted,
+                "rejected_queue_full": self._rejected_full,
+                "rejected_timeout": self._rejected_timeout,
+                "avg_queue_wait_ms": (self._wait_total / self._admitted * 1000.0) if self._admitted else 0.0,
+            }
+
+
+def configure_torch_threads() -> None:
+    """Apply the configured torch intra-op / inter-op thread budgets (call once at startup)"""
+    import torch
+
+    if settings.TORCH_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(settings.TORCH_INTRA_OP_THREADS)
+    if settings.TORCH_INTER_OP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(settings.TORCH_INTER_OP_THREADS)
+        except RuntimeError:
+            # can only be set before any inter-op parallel work has started
+            logger.warning("Could not set torch inter-op threads, parallel work already started")
+
+
+inference_admission = AdmissionController(
+    max_concurrent=settings.INFERENCE_MAX_CONCURRENCY,
+    max_queue=settings.INFERENCE_MAX_QUEUE,
+    queue_timeout=settings.INFERENCE_QUEUE_TIMEOUT,
+    retry_after=settings.INFERENCE_RETRY_AFTER,
+)
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    """
+    Collects concurrent calls into batches and runs them with a single call.
+
+    Callers block in submit() until their item has been processed. A background
+    thread waits for the first item, then keeps collecting until either
+    max_batch_size items are queued or max_wait_ms has passed since the first
+    item arrived, and hands the whole batch to batch_fn.
+    batch_fn must return one result per input item, in the same order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Queue = Queue()
+        self._start_lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+        # metrics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes: Counter = Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, item: Any) -> Any:
+        """Queue an item and block until its result is ready."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = first[2] + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        # window closed, but still take whatever is already waiting
+                        batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+
+            self._execute(batch)
+
+    def _execute(self, batch: list) -> None:
+        started = time.perf_counter()
+        items = [entry[0] for entry in batch]
+        futures = [entry[1] for entry in batch]
+        waits = [started - entry[2] for entry in batch]
+
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] += 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self) -> dict:
+        """Batch size and queue wait metrics collected so far."""
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_queue_wait_ms": (self._wait_total / self._items * 1000.0) if self._items else 0.0,
+                "max_queue_wait_ms": self._wait_max * 1000.0,
+            }
@@ -0,0 +1,180 @@
+"""
+Pick per-class confidence thresholds for the stage-1 cascade.
+
+Usage:
+    python -m app.utils.calibrate_cascade --data-dir samples/labelled --max-accuracy-loss 0.01
+    python -m app.utils.calibrate_cascade --data-dir samples/labelled --version v1.1.0 --dry-run
+
+--data-dir holds one folder per model_major class (inorganic/, hazardous/,
+organic/). Every image runs through the light classifier and model_major;
+thresholds are then lowered greedily, accepting the light answer for as
+many images as possible while cascade accuracy stays within
+--max-accuracy-loss (absolute) of model_major alone. The result is written
+next to the version's model_light.pt as model_light.thresholds.json, which
+load_models() picks up.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import torch
+
+from app.core.config import settings
+from app.utils.cascade import NEVER_ACCEPT, thresholds_path
+from app.utils.inference_backends import load_eager_classifier
+from app.utils.ml_core_logic import (
+    CATEGORIES,
+    predict_model_1_batch,
+    preprocess_image,
+    preprocess_light,
+    registry,
+)
+from app.utils.precision import batched
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def list_labelled_images(folder: Path) -> list[tuple[Path, str]]:
+    images = []
+    for category in CATEGORIES['model_major']:
+        class_dir = folder / category
+        if class_dir.is_dir():
+            images.extend(
+                (p, category) for p in sorted(class_dir.iterdir()) if p.suffix.lower() in IMAGE_EXTENSIONS
+            )
+    return images
+
+
+def run_classifier(model, images: list[Path], preprocess, batch_size: int) -> list[dict]:
+    results = []
+    for batch in batched(images, batch_size, lambda p: preprocess(str(p))):
+        results.extend(predict_model_1_batch(list(batch), model, CATEGORIES['model_major'], precision='fp32'))
+    return results
+
+
+def cascade_accuracy(samples: list[dict], thresholds: dict) -> tuple[float, float]:
+    """(accuracy, escalation rate) of the cascade with the given thresholds"""
+    correct = escalated = 0
+    for s in samples:
+        if s['light_confidence'] >= thresholds[s['light']]:
+            correct += s['light'] == s['truth']
+        else:
+            escalated += 1
+            correct += s['major'] == s['truth']
+    return correct / len(samples), escalated / len(samples)
+
+
+def pick_thresholds(samples: list[dict], max_loss: float) -> dict:
+    """
+    Start with every item escalated (cascade == model_major), then keep
+    accepting the light answer for the next most confident item of some
+    class, preferring items where that costs no accuracy (then the most
+    confident ones), until the accuracy budget is spent. A class's
+    threshold is the confidence of the last item accepted for it.
+    """
+    # per class, light-predicted items from most to least confident
+    queues = {
+        category: sorted(
+            (s for s in samples if s['light'] == category), key=lambda s: s['light_confidence'], reverse=True
+        )
+        for category in CATEGORIES['model_major']
+    }
+    positions = {category: 0 for category in queues}
+    thresholds = {category: NEVER_ACCEPT for category in queues}
+    budget = max_loss * len(samples)  # in wrongly answered images
+    spent = 0
+
+    def gain(s: dict) -> int:
+        # +1 light fixes a major error, 0 no change, -1 light adds an error
+        return int(s['light'] == s['truth']) - int(s['major'] == s['truth'])
+
+    while True:
+        # best gain first, then the most confident item
+        candidates = [
+            (gain(queue[positions[category]]), queue[positions[category]]['light_confidence'], category)
+            for category, queue in queues.items()
+            if positions[category] < len(queue)
+        ]
+        if not candidates:
+            break
+        best_gain, _, category = max(candidates)
+        if best_gain < 0 and spent - best_gain > budget:
+            break
+        spent -= best_gain
+        item = queues[category][positions[category]]
+        positions[category] += 1
+        thresholds[category] = item['light_confidence']
+    return thresholds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, required=True, help="One folder of images per class")
+    parser.add_argument("--max-accuracy-loss", type=float, default=0.01,
+                        help="Allowed absolute drop in stage-1 accuracy vs model_major alone")
+    parser.add_argument("--version", help="Registry version to calibrate (default: the active one)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--dry-run", action="store_true", help="Print the thresholds without writing them")
+    args = parser.parse_args()
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    version = registry.get_version(args.version or registry.active_version)
+    light_path = version.paths.get('model_light')
+    if not light_path or not Path(light_path).exists():
+        print(f"Model version '{version.name}' has no light classifier ({light_path})")
+        return 1
+
+    labelled = list_labelled_images(args.data_dir)
+    if not labelled:
+        print(f"No labelled images found in {args.data_dir}")
+        return 1
+    images = [path for path, _ in labelled]
+
+    num_classes = len(CATEGORIES['model_major'])
+    light = load_eager_classifier(light_path, num_classes, device, arch=settings.INFERENCE_CASCADE_LIGHT_ARCH)
+    major = load_eager_classifier(version.paths['model_major'], num_classes, device)
+    print(f"Running {len(images)} images through both classifiers of {version.name}...")
+    light_results = run_classifier(light, images, preprocess_light, args.batch_size)
+    major_results = run_classifier(major, images, preprocess_image, args.batch_size)
+
+    samples = [
+        {
+            'truth': truth,
+            'light': l['category'],
+            'light_confidence': l['confidence'],
+            'major': m['category'],
+        }
+        for (_, truth), l, m in zip(labelled, light_results, major_results)
+    ]
+
+    major_accuracy = sum(s['major'] == s['truth'] for s in samples) / len(samples)
+    light_accuracy = sum(s['light'] == s['truth'] for s in samples) / len(samples)
+    thresholds = pick_thresholds(samples, args.max_accuracy_loss)
+    accuracy, escalation_rate = cascade_accuracy(samples, thresholds)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model_version": version.name,
+        "light_arch": settings.INFERENCE_CASCADE_LIGHT_ARCH,
+        "light_input_size": settings.INFERENCE_CASCADE_LIGHT_INPUT_SIZE,
+        "images": len(samples),
+        "max_accuracy_loss": args.max_accuracy_loss,
+        "accuracy_model_major": major_accuracy,
+        "accuracy_light": light_accuracy,
+        "accuracy_cascade": accuracy,
+        "escalation_rate": escalation_rate,
+        "thresholds": thresholds,
+    }
+    print(json.dumps(report, indent=2))
+
+    if not args.dry_run:
+        path = thresholds_path(light_path)
+        path.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import json
+import threading
+from collections import Counter
+from pathlib import Path
+
+from prometheus_client import Counter as PromCounter
+
+from app.core.config import settings
+
+# Confidence-gated cascade for stage 1: a small classifier answers first and
+# only items it is unsure about (softmax confidence below the threshold of
+# the class it predicted) are escalated to model_major.
+
+# above any softmax confidence, i.e. always escalate that class
+NEVER_ACCEPT = 1.01
+
+CASCADE_ITEMS = PromCounter(
+    "trashos_cascade_items",
+    "Stage-1 items by the tier that answered them",
+    ["tier", "category"],
+)
+
+
+def thresholds_path(light_weights: str) -> Path:
+    """Thresholds picked by `python -m app.utils.calibrate_cascade`, stored next to the light weights"""
+    path = Path(light_weights)
+    return path.with_name(path.stem + ".thresholds.json")
+
+
+def parse_threshold_overrides(value: str) -> dict:
+    """"hazardous=0.98,organic=0.9" -> {"hazardous": 0.98, "organic": 0.9}"""
+    overrides = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        category, _, threshold = entry.partition("=")
+        overrides[category.strip()] = float(threshold)
+    return overrides
+
+
+def load_thresholds(light_weights: str, categories: list) -> dict:
+    """
+    Per-class acceptance thresholds for the light tier: INFERENCE_CASCADE_THRESHOLDS
+    overrides, then the calibrated file, then INFERENCE_CASCADE_THRESHOLD
+    """
+    thresholds = {category: settings.INFERENCE_CASCADE_THRESHOLD for category in categories}
+    path = thresholds_path(light_weights)
+    if path.exists():
+        thresholds.update(json.loads(path.read_text()).get("thresholds", {}))
+    thresholds.update(parse_threshold_overrides(settings.INFERENCE_CASCADE_THRESHOLDS))
+    return thresholds
+
+
+def accept(result: dict, thresholds: dict) -> bool:
+    """Whether the light tier's answer is confident enough to skip model_major"""
+    return result['confidence'] >= thresholds.get(result['category'], NEVER_ACCEPT)
+
+
+class CascadeStats:
+    """Accepted / escalated counts per class predicted by the light tier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accepted: Counter = Counter()
+        self._escalated: Counter = Counter()
+
+    def record(self, category: str, accepted: bool) -> None:
+        with self._lock:
+            (self._accepted if accepted else self._escalated)[category] += 1
+        CASCADE_ITEMS.labels("light" if accepted else "escalated", category).inc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            accepted = sum(self._accepted.values())
+            escalated = sum(self._escalated.values())
+            return {
+                "enabled": settings.INFERENCE_CASCADE_ENABLED,
+                "accepted": dict(self._accepted),
+                "escalated": dict(self._escalated),
+                "escalation_rate": (escalated / (accepted + escalated)) if accepted + escalated else 0.0,
+            }
+
+
+cascade_stats = CascadeStats()
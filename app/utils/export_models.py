@@ -0,0 +1,140 @@
+"""
+Export both models to TorchScript (frozen) and ONNX, and check parity with eager.
+
+Usage:
+    python -m app.utils.export_models --backends onnx torchscript --sample-dir samples/
+    python -m app.utils.export_models --parity-only --backends onnx --sample-dir samples/
+    python -m app.utils.export_models --version v1.1.0 --backends onnx
+
+Artifacts are written next to the weights of the registry version given by
+--version (default: the active one), where that version loads them from.
+
+The parity check runs every image in --sample-dir through eager PyTorch and
+each exported backend and requires the same top-1 class from both stages.
+Exits with status 1 if any backend disagrees with eager on any image.
+"""
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+import torch
+
+from app.utils.inference_backends import (
+    BACKENDS,
+    MAJOR_SUFFIXES,
+    SUBCLASS_SUFFIXES,
+    artifact_path,
+    load_classifier,
+    load_detector,
+    load_eager_classifier,
+    load_eager_detector,
+)
+from app.utils.ml_core_logic import (
+    CATEGORIES,
+    predict_model_1_batch,
+    predict_model_2_batch,
+    preprocess_image,
+    registry,
+)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+INPUT_SIZE = (1, 3, 260, 260)
+
+
+def export_classifier(backend: str, paths: dict) -> Path:
+    """Export model 1 on CPU; runtime device placement happens at load time"""
+    model = load_eager_classifier(paths['model_major'], len(CATEGORIES['model_major']), 'cpu')
+    example = torch.randn(*INPUT_SIZE)
+    path = artifact_path(paths['model_major'], backend, MAJOR_SUFFIXES)
+
+    if backend == "torchscript":
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+            frozen = torch.jit.freeze(traced)
+        frozen.save(str(path))
+    elif backend == "onnx":
+        torch.onnx.export(
+            model,
+            example,
+            str(path),
+            input_names=["input"],
+            output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=17,
+            dynamo=False,
+        )
+    return path
+
+
+def export_detector(backend: str, paths: dict) -> Path:
+    """Export model 2 through ultralytics with a dynamic batch dimension"""
+    model = load_eager_detector(paths['model_subclass'], 'cpu')
+    exported = Path(model.export(format=backend, dynamic=True, device='cpu'))
+    path = artifact_path(paths['model_subclass'], backend, SUBCLASS_SUFFIXES)
+    if exported.resolve() != path.resolve():
+        shutil.move(str(exported), str(path))
+    return path
+
+
+def check_parity(backend: str, paths: dict, sample_dir: Path, device: str) -> int:
+    """Compare top-1 classes of a backend against eager. Returns the number of mismatches."""
+    images = sorted(p for p in sample_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not images:
+        print(f"No images found in {sample_dir}")
+        return 0
+
+    eager_major = load_eager_classifier(paths['model_major'], len(CATEGORIES['model_major']), device)
+    eager_subclass = load_eager_detector(paths['model_subclass'], device)
+    major = load_classifier(backend, paths['model_major'], len(CATEGORIES['model_major']), device)
+    subclass = load_detector(backend, paths['model_subclass'], device)
+
+    mismatches = 0
+    for image_path in images:
+        tensor = preprocess_image(str(image_path))
+        expected_1 = predict_model_1_batch([tensor], eager_major, CATEGORIES['model_major'])[0]
+        actual_1 = predict_model_1_batch([tensor], major, CATEGORIES['model_major'])[0]
+        expected_2 = predict_model_2_batch([str(image_path)], eager_subclass, CATEGORIES['model_subclass'])[0]
+        actual_2 = predict_model_2_batch([str(image_path)], subclass, CATEGORIES['model_subclass'])[0]
+
+        ok = expected_1['category'] == actual_1['category'] and expected_2['category'] == actual_2['category']
+        if not ok:
+            mismatches += 1
+            print(
+                f"  MISMATCH {image_path.name}: "
+                f"model_major eager={expected_1['category']} {backend}={actual_1['category']}, "
+                f"model_subclass eager={expected_2['category']} {backend}={actual_2['category']}"
+            )
+
+    print(f"{backend}: {len(images) - mismatches}/{len(images)} images match eager top-1")
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["onnx", "torchscript"],
+                        choices=[b for b in BACKENDS if b != "eager"])
+    parser.add_argument("--sample-dir", type=Path, help="Folder of images for the parity check")
+    parser.add_argument("--parity-only", action="store_true", help="Skip exporting, only check parity")
+    parser.add_argument("--version", help="Registry version to export (default: the active one)")
+    args = parser.parse_args()
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    version = registry.get_version(args.version or registry.active_version)
+    print(f"Model version {version.name}")
+
+    if not args.parity_only:
+        for backend in args.backends:
+            print(f"Exporting model_major -> {export_classifier(backend, version.paths)}")
+            print(f"Exporting model_subclass -> {export_detector(backend, version.paths)}")
+
+    if args.sample_dir is None:
+        print("No --sample-dir given, skipping parity check")
+        return 0
+
+    failed = sum(check_parity(backend, version.paths, args.sample_dir, device) for backend in args.backends)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,129 @@
-from fastapi import HTTPException, UploadFile, File, status
-from pathlib import Path
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.utils.image_renditions import InvalidImage, probe
+from app.utils.metrics import observe_stage, server_timing
+from app.utils.storage import storage, url_for_key
 
-TEMP_DIR = Path("temp")
 MAX_FILE_SIZE=10*1024*1024
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png",".webp"}
-ALLOWED_MIME_TYPES = {
-    "image/jpeg", 
-    "image/jpg", 
-    "image/png", 
-    "image/webp"
-}
-
-TEMP_DIR.mkdir(exist_ok=True)
-
-def validate_image_file(file: UploadFile) -> None:
-    """Validate uploaded image file"""
+CHUNK_SIZE = 64 * 1024
+# multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@dataclass
+class IngestedUpload:
+    """An upload that passed validation and is in blob storage"""
+    key: str
+    data: Optional[bytes]  # the original upload, only kept when asked for (keep_data)
+    digest: str  # sha256 hex of the upload, same as result_cache.content_hash(data)
+
+    @property
+    def url(self) -> str:
+        return url_for_key(self.key)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """File extension for the image format in the first bytes, None if it is not an allowed image"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="File size exceeds maximum allowed size of 10MB"
+    )
+
+
+def ingest_upload(file: UploadFile, keep_data: bool = True) -> IngestedUpload:
+    """
+    Validate an upload in one chunked pass, streaming it into blob storage.
+    The type comes from the magic bytes, not the client's content type or
+    filename; the size limit is enforced while reading and the sha256 is
+    computed on the way. Chunks go to a temporary blob that is committed under
+    the content key at the end; keep_data also keeps the bytes in memory, for
+    callers that classify them right away. The original is stored as uploaded;
+    with IMAGE_NORMALIZE only its header is checked here, the WebP renditions
+    replace it later, off the inference path (see store_renditions).
+    Blobs are content addressed, so a repeated image is stored once. Blobs of
+    uploads that fail later are not deleted here (another submission may share
+    them); the garbage collector in app/db/blob_refs.py removes them.
+    Blocking reads and writes: call it from a sync handler (worker thread).
+    """
     if file.size and file.size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail="File size exceeds maximum allowed size of 10MB"
-        )
-    
-    if file.content_type not in ALLOWED_MIME_TYPES:
+        raise _too_large()
+
+    first = file.file.read(CHUNK_SIZE)
+    extension = sniff_image_type(first)
+    if extension is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Only image files are allowed"
+            detail="Invalid file type. Only jpg, png and webp images are allowed"
         )
-    
-    if file.filename:
-        file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid file extension. Only jpg, png, gif, webp files are allowed"
-            )
-        
 
+    hasher = hashlib.sha256()
+    data = bytearray() if keep_data else None
+    size = 0
+    with observe_stage("upload_write"), server_timing("storage"), storage.writer() as blob:
+        chunk = first
+        while chunk:
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                raise _too_large()
+            hasher.update(chunk)
+            blob.write(chunk)
+            if data is not None:
+                data += chunk
+            chunk = file.file.read(CHUNK_SIZE)
+
+        if settings.IMAGE_NORMALIZE:
+            try:
+                with blob.reader() as stored:
+                    probe(stored)
+            except InvalidImage:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid or corrupt image"
+                )
+
+        digest = hasher.hexdigest()
+        key = digest + extension
+        blob.commit(key)
+
+    return IngestedUpload(key=key, data=bytes(data) if data is not None else None, digest=digest)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject uploads whose declared Content-Length is over the limit for their
+    route before the body is read, so oversized requests are never spooled.
+    Bodies without a Content-Length are still capped by ingest_upload.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits  # exact POST path -> max body bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"])
+            if limit is not None:
+                for name, value in scope["headers"]:
+                    if name == b"content-length":
+                        if value.isdigit() and int(value) > limit:
+                            response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+                            await response(scope, receive, send)
+                            return
+                        break
+        await self.app(scope, receive, send)
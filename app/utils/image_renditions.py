@@ -0,0 +1,73 @@
+import io
+from typing import BinaryIO
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+# Pillow only warns up to twice this and raises above; _open() enforces it exactly
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _encode_webp(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    # no exif / icc arguments, so no metadata is carried over
+    image.save(buffer, format="WEBP", quality=settings.IMAGE_WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _fit(image: Image.Image, max_side: int) -> Image.Image:
+    if max(image.size) <= max_side:
+        return image
+    resized = image.copy()
+    resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return resized
+
+
+def _open(source: bytes | BinaryIO) -> Image.Image:
+    """Open an upload (header only, pixels not decoded yet) and enforce IMAGE_MAX_PIXELS"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        image = Image.open(source)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise InvalidImage(f"Image has {image.width * image.height} pixels, the limit is {settings.IMAGE_MAX_PIXELS}")
+    return image
+
+
+def probe(source: bytes | BinaryIO) -> None:
+    """Cheap upload check: a readable image header within the pixel limit"""
+    _open(source)
+
+
+def normalize(data: bytes) -> Image.Image:
+    """
+    Decode an upload into the RGB image that is classified and stored:
+    EXIF orientation applied to the pixels, longest side capped at
+    IMAGE_MAX_DIMENSION. Decoded once, the same image feeds the models
+    and encode_renditions().
+    """
+    image = _open(data)
+    try:
+        # JPEG can decode straight at a reduced scale, much cheaper for large photos
+        image.draft("RGB", (settings.IMAGE_MAX_DIMENSION, settings.IMAGE_MAX_DIMENSION))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    return _fit(image, settings.IMAGE_MAX_DIMENSION)
+
+
+def encode_renditions(image: Image.Image) -> tuple[bytes, dict[int, bytes]]:
+    """WebP copy of a normalize()d image plus one WebP thumbnail per configured size, no metadata"""
+    thumbnails = {
+        size: _encode_webp(_fit(image, size))
+        for size in settings.IMAGE_THUMBNAIL_SIZES
+    }
+    return _encode_webp(image), thumbnails
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import numpy as np
+import timm
+import torch
+from ultralytics import YOLO
+
+BACKENDS = ("eager", "torchscript", "onnx")
+
+# Exported artifacts live next to the eager weights, e.g.
+# model_major.pt -> model_major.torchscript.pt / model_major.onnx
+# model2.pt      -> model2.torchscript         / model2.onnx  (ultralytics naming)
+MAJOR_SUFFIXES = {"eager": ".pt", "torchscript": ".torchscript.pt", "onnx": ".onnx"}
+SUBCLASS_SUFFIXES = {"eager": ".pt", "torchscript": ".torchscript", "onnx": ".onnx"}
+
+
+def artifact_path(weights_path: str, backend: str, suffixes: dict) -> Path:
+    """Path of the artifact for a backend, derived from the eager weights path"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+    path = Path(weights_path)
+    return path.with_name(path.stem + suffixes[backend])
+
+
+# ============================================
+# MODEL 1 (classifier) BACKENDS
+# ============================================
+# Every classifier takes a float (N, 3, H, W) batch and returns (N, num_classes) logits,
+# so predict_model_1_batch does not care which one it is talking to.
+
+def load_eager_classifier(weights_path: str, num_classes: int, device: str,
+                          arch: str = 'efficientnet_b2') -> torch.nn.Module:
+    """timm classifier (EfficientNet-B2 unless arch says otherwise) from a state_dict checkpoint"""
+    model = timm.create_model(arch, pretrained=False, num_classes=num_classes)
+    state_dict = torch.load(weights_path, map_location=device, weights_only=False)
+    # If checkpoint has more classes than categories, only load matching weights
+    if 'classifier.weight' in state_dict and state_dict['classifier.weight'].shape[0] != num_classes:
+        state_dict['classifier.weight'] = state_dict['classifier.weight'][:num_classes]
+        state_dict['classifier.bias'] = state_dict['classifier.bias'][:num_classes]
+    model.load_state_dict(state_dict)
+    model = model.to(device)
+    model.eval()
+    return model
+
+
+class OnnxClassifier:
+    """ONNX Runtime session behind the same call signature as the torch module"""
+
+    def __init__(self, path: Path, device: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("INFERENCE_BACKEND=onnx requires the onnxruntime package") from e
+
+        providers = ["CPUExecutionProvider"]
+        if device == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(path), sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        inputs = batch.detach().cpu().numpy().astype(np.float32, copy=False)
+        logits = self.session.run(None, {self.input_name: inputs})[0]
+        return torch.from_numpy(logits)
+
+
+def load_classifier(backend: str, weights_path: str, num_classes: int, device: str):
+    """Load model 1 for the configured backend"""
+    if backend == "eager":
+        return load_eager_classifier(weights_path, num_classes, device)
+
+    path = artifact_path(weights_path, backend, MAJOR_SUFFIXES)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found, run `python -m app.utils.export_models --backends {backend}` first")
+
+    if backend == "torchscript":
+        model = torch.jit.load(str(path), map_location=device)
+        model.eval()
+        return model
+    return OnnxClassifier(path, device)
+
+
+# ============================================
+# MODEL 2 (YOLO) BACKENDS
+# ============================================
+
+def load_eager_detector(weights_path: str, device: str) -> YOLO:
+    try:
+        # Try loading as YOLO model
+        return YOLO(weights_path)
+    except KeyError:
+        # If it fails, it's probably saved from ultralytics training incorrectly
+        # Try loading the weights manually
+        model = YOLO('yolov8n.pt')  # Start with base model
+
+        # Load your custom weights
+        checkpoint = torch.load(weights_path, map_location=device)
+        model.model.load_state_dict(checkpoint)
+        return model
+
+
+def load_detector(backend: str, weights_path: str, device: str) -> YOLO:
+    """Load model 2; ultralytics runs exported ONNX/TorchScript files natively"""
+    if backend == "eager":
+        return load_eager_detector(weights_path, device)
+
+    path = artifact_path(weights_path, backend, SUBCLASS_SUFFIXES)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found, run `python -m app.utils.export_models --backends {backend}` first")
+    return YOLO(str(path), task="detect")
@@ -0,0 +1,283 @@
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = None
+
+
+def _split_cores(num_workers: int, cores_per_worker: int) -> list[list[int]]:
+    """Assign each worker its own slice of the cores this process may run on"""
+    try:
+        available = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        # no affinity support on this platform, leave scheduling to the OS
+        return [[] for _ in range(num_workers)]
+
+    if cores_per_worker <= 0:
+        cores_per_worker = max(1, len(available) // num_workers)
+
+    core_sets = []
+    for i in range(num_workers):
+        start = (i * cores_per_worker) % len(available)
+        core_sets.append([available[(start + j) % len(available)] for j in range(cores_per_worker)])
+    return core_sets
+
+
+def _worker_main(worker_id: int, cores: list[int], tasks, results, threads: int) -> None:
+    """Entry point of an inference process: pin, load the models once, serve tasks"""
+    from app.core.log import configure_logging
+    configure_logging()
+
+    if cores:
+        os.sched_setaffinity(0, cores)
+
+    import torch
+    torch.set_num_threads(max(1, len(cores) or torch.get_num_threads()))
+
+    from app.utils import ml_core_logic
+    ml_core_logic.load_models()
+    # speculation backs off once this worker's serving threads are busy
+    ml_core_logic.speculation.capacity = max(1, threads)
+
+    def serve() -> None:
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                # let the sibling threads see it as well
+                tasks.put(_STOP)
+                return
+
+            job_id, shm_name, shape, dtype = task
+            shm = shared_memory.SharedMemory(name=shm_name)
+            # the API process owns the block and unlinks it, don't track it twice
+            resource_tracker.unregister(shm._name, "shared_memory")
+            try:
+                image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                result = ml_core_logic.predict_waste_classification(image)
+                del image
+                results.put((job_id, result, None))
+            except Exception as e:
+                results.put((job_id, None, f"{type(e).__name__}: {e}"))
+            finally:
+                shm.close()
+
+    # a few threads per process so the in-process micro-batchers can group work
+    workers = [threading.Thread(target=serve, daemon=True) for _ in range(max(1, threads))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+class _Worker:
+    """
+    One inference process with its own task and result queues: a process that
+    dies inside Queue.get() takes the queue's lock with it, so sharing queues
+    would wedge the surviving workers too.
+    """
+
+    def __init__(self, ctx, worker_id: int, cores: list[int], threads: int, on_result):
+        self.worker_id = worker_id
+        self.cores = cores
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.pending: dict[int, Future] = {}  # guarded by the pool's lock
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, cores, self.tasks, self.results, threads),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        self.collector = threading.Thread(
+            target=on_result, args=(self,), name=f"inference-results-{worker_id}", daemon=True
+        )
+
+    def start(self) -> None:
+        self.process.start()
+        self.collector.start()
+
+    def close(self) -> None:
+        """Stop the collector and release the queues (the process is already gone)"""
+        self.results.put(_STOP)
+        self.collector.join(timeout=1.0)
+        self.tasks.cancel_join_thread()
+        self.tasks.close()
+
+
+class InferencePool:
+    """
+    Pool of inference processes, each pinned to its own set of cores.
+
+    The API process decodes the image and copies the raw RGB array into a
+    shared memory block; only the block name and shape go through the task
+    queue of the least busy worker. Each worker loads the models once and
+    returns the same result dict as predict_waste_classification.
+
+    A monitor thread restarts workers that die (crash, OOM kill) and fails
+    the requests they were holding right away instead of letting them run
+    into the timeout.
+    """
+
+    def __init__(self, num_workers: int, cores_per_worker: int = 0, threads_per_worker: int = 2,
+                 timeout: float = 60.0, monitor_interval: float = 1.0):
+        self.num_workers = num_workers
+        self.cores_per_worker = cores_per_worker
+        self.threads_per_worker = threads_per_worker
+        self.timeout = timeout
+        self.monitor_interval = monitor_interval
+
+        self._ctx = mp.get_context("spawn")
+        self._workers: list[_Worker] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._monitor: threading.Thread | None = None
+        self._job_ids = itertools.count()
+        self._restarts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.num_workers > 0
+
+    @property
+    def started(self) -> bool:
+        """start() was called and stop() was not: inference belongs to the pool, live workers or not"""
+        return bool(self._workers)
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return any(worker.process.is_alive() for worker in self._workers)
+
+    def start(self) -> None:
+        if not self.enabled or self.started:
+            return
+
+        self._stopping.clear()
+        with self._lock:
+            for worker_id, cores in enumerate(_split_cores(self.num_workers, self.cores_per_worker)):
+                worker = self._new_worker(worker_id, cores)
+                worker.start()
+                self._workers.append(worker)
+
+        self._monitor = threading.Thread(target=self._watch, name="inference-monitor", daemon=True)
+        self._monitor.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if not self.started:
+            return
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=timeout)
+
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.tasks.put(_STOP)
+        for worker in workers:
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.close()
+            self._fail_pending(worker, "Inference pool stopped")
+
+    def predict(self, image: np.ndarray) -> dict:
+        """Run the full pipeline on a decoded (H, W, 3) uint8 array in a worker process"""
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        try:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+
+            job_id = next(self._job_ids)
+            future: Future = Future()
+            with self._lock:
+                live = [worker for worker in self._workers if worker.process.is_alive()]
+                if not live:
+                    raise RuntimeError("No live inference workers")
+                worker = min(live, key=lambda w: len(w.pending))
+                worker.pending[job_id] = future
+
+            worker.tasks.put((job_id, shm.name, image.shape, image.dtype.str))
+            try:
+                return future.result(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    worker.pending.pop(job_id, None)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _new_worker(self, worker_id: int, cores: list[int]) -> _Worker:
+        return _Worker(self._ctx, worker_id, cores, self.threads_per_worker, self._collect)
+
+    def _collect(self, worker: _Worker) -> None:
+        while True:
+            message = worker.results.get()
+            if message is _STOP:
+                return
+            job_id, result, error = message
+            with self._lock:
+                future = worker.pending.get(job_id)
+            if future is None or future.done():
+                # caller already timed out
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+
+    def _watch(self) -> None:
+        """Replace dead workers, failing whatever they were working on"""
+        while not self._stopping.wait(self.monitor_interval):
+            with self._lock:
+                dead = [(i, w) for i, w in enumerate(self._workers) if not w.process.is_alive()]
+            for index, worker in dead:
+                exitcode = worker.process.exitcode
+                logger.warning("Inference worker died, restarting", extra={
+                    "worker": worker.worker_id, "exitcode": exitcode,
+                    "in_flight": len(worker.pending),
+                })
+                replacement = self._new_worker(worker.worker_id, worker.cores)
+                with self._lock:
+                    if self._stopping.is_set():
+                        # stop() cleans up the dead worker itself
+                        return
+                    self._workers[index] = replacement
+                    self._restarts += 1
+                    replacement.start()
+                # deliver whatever it finished before dying, then fail the rest
+                worker.close()
+                self._fail_pending(worker, f"Inference worker {worker.worker_id} exited with code {exitcode}")
+
+    def _fail_pending(self, worker: _Worker, reason: str) -> None:
+        with self._lock:
+            pending, worker.pending = worker.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "alive": sum(1 for w in self._workers if w.process.is_alive()),
+                "in_flight": sum(len(w.pending) for w in self._workers),
+                "restarts": self._restarts,
+            }
+
+
+inference_pool = InferencePool(
+    num_workers=settings.INFERENCE_POOL_WORKERS,
+    cores_per_worker=settings.INFERENCE_POOL_CORES_PER_WORKER,
+    threads_per_worker=settings.INFERENCE_POOL_THREADS_PER_WORKER,
+    timeout=settings.INFERENCE_POOL_TIMEOUT,
+)
@@ -0,0 +1,178 @@
+"""
+Prometheus metrics, scraped from GET /metrics.
+
+With several processes (uvicorn workers, the inference pool) point
+PROMETHEUS_MULTIPROC_DIR at an empty directory before start-up; histograms
+recorded in any process are then aggregated at scrape time.
+
+The same request also gets its own breakdown back in a Server-Timing header
+(decode, model1, model2, db, ...) collected through server_timing().
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from app.core.config import settings
+
+# seconds; covers sub-ms preprocessing up to multi-second CPU inference
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "trashos_pipeline_stage_seconds",
+    "Time spent in each stage of submission processing",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+
+DB_COMMIT_SECONDS = Histogram(
+    "trashos_db_commit_seconds",
+    "Duration of database commits on the submission path",
+    ["operation"],
+    buckets=_STAGE_BUCKETS,
+)
+
+REQUEST_SECONDS = Histogram(
+    "trashos_http_request_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    "trashos_model_load_seconds",
+    "Time the last load_models() call took to load both models",
+    multiprocess_mode="max",
+)
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Record the duration of the block under a pipeline stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+# name -> accumulated seconds for the current request, None outside a request.
+# Sync routes run in a threadpool with a copy of the context, which still
+# points at the same dict, so timings recorded there reach the middleware.
+_request_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def server_timing(name: str):
+    """Add the duration of the block to the current request's Server-Timing entry"""
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def timed_commit(db, operation: str) -> None:
+    """db.commit() with its duration recorded"""
+    with server_timing("db"), DB_COMMIT_SECONDS.labels(operation).time():
+        db.commit()
+
+
+def format_server_timing(timings: dict, total: float) -> bytes:
+    entries = [f"{name};dur={seconds * 1000.0:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000.0:.1f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class ServerTimingMiddleware:
+    """Append a Server-Timing header with the stages recorded while handling the request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SERVER_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(timings, time.perf_counter() - started)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """Per-route request latency; routes are labelled by their template, not the raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            ).observe(time.perf_counter() - started)
+
+
+# collectors that read live component state at scrape time (see api/routes/metrics.py);
+# kept apart from the default registry so they are exported once in multiprocess mode too
+COMPONENT_REGISTRY = CollectorRegistry(auto_describe=True)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition payload and content type for the /metrics route"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        from prometheus_client.process_collector import ProcessCollector
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # RSS / CPU of the API process itself
+        ProcessCollector(registry=registry)
+    else:
+        # the default registry already exports process_resident_memory_bytes etc.
+        registry = REGISTRY
+
+    return generate_latest(registry) + generate_latest(COMPONENT_REGISTRY), CONTENT_TYPE_LATEST
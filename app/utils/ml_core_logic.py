@@ -1,49 +1,105 @@
+import io
+import time
+from pathlib import Path
+
+import numpy as np
 import torch
-import timm
 from torchvision import transforms
 from PIL import Image
-from ultralytics import YOLO
 
+from app.core.config import settings
+from app.core.log import get_logger, start_trace
+from app.utils.admission import inference_admission
+from app.utils.batching import MicroBatcher
+from app.utils.cascade import accept, cascade_stats, load_thresholds
+from app.utils.inference_backends import load_classifier, load_detector, load_eager_classifier
+from app.utils.metrics import MODEL_LOAD_SECONDS, observe_stage, server_timing
+from app.utils.model_registry import LoadedModels, ModelRegistry, ModelVersion
+from app.utils.precision import apply_classifier_precision, autocast_context, input_dtype, validate_precision
+from app.utils.speculation import SpeculativeStage
 
 MODEL_PATHS = {
     # model2.pt is a timm EfficientNet-B2 state_dict (classification)
     'model_major': 'app/utils/model_major.pt',
     'model_subclass': 'app/utils/model2.pt',
+    # optional small classifier for the stage-1 cascade (INFERENCE_CASCADE_ENABLED)
+    'model_light': 'app/utils/model_light.pt',
 }
+MODEL_VERSION = 'v1.0.0'
 CATEGORIES = {
     'model_major': ['inorganic', 'hazardous', 'organic'],
     'model_subclass': ['Aluminum_Cans', 'PET_bottle', 'carton_box', 'carton_drink']
 }
 
+logger = get_logger(__name__)
+
 #LOAD MODELS
 device = 'cuda' if torch.cuda.is_available() else 'cpu'
 
-# Model 1: timm EfficientNet-B2 for waste classification
-model_major = timm.create_model('efficientnet_b2', pretrained=False, num_classes=len(CATEGORIES['model_major']))
-state_dict = torch.load(MODEL_PATHS['model_major'], map_location=device, weights_only=False)
-# If checkpoint has more classes than categories, only load matching weights
-if state_dict['classifier.weight'].shape[0] != len(CATEGORIES['model_major']):
-    state_dict['classifier.weight'] = state_dict['classifier.weight'][:len(CATEGORIES['model_major'])]
-    state_dict['classifier.bias'] = state_dict['classifier.bias'][:len(CATEGORIES['model_major'])]
-model_major.load_state_dict(state_dict)
-model_major = model_major.to(device)
-model_major.eval()
-
-# Model 2: YOLO detection for material types
-# In ml_core_logic.py, replace the YOLO loading with:
-
-try:
-    # Try loading as YOLO model
-    model_subclass = YOLO(MODEL_PATHS['model_subclass'])
-except KeyError:
-    # If it fails, it's probably saved from ultralytics training incorrectly
-    # Try loading the weights manually
-    from ultralytics import YOLO
-    model_subclass = YOLO('yolov8n.pt')  # Start with base model
-    
-    # Load your custom weights
-    checkpoint = torch.load(MODEL_PATHS['model_subclass'], map_location=device)
-    model_subclass.model.load_state_dict(checkpoint)
+
+def _load_model_set(version: ModelVersion) -> LoadedModels:
+    """Load both models of one registry version with the configured backend and precision"""
+    started = time.perf_counter()
+    backend = settings.INFERENCE_BACKEND
+    precision = settings.INFERENCE_PRECISION
+    validate_precision(precision, backend, device)
+
+    # Model 1: timm EfficientNet-B2 for waste classification
+    major = load_classifier(backend, version.paths['model_major'], len(CATEGORIES['model_major']), device)
+    major = apply_classifier_precision(major, precision, version.paths['model_major'])
+
+    # Model 2: YOLO detection for material types
+    subclass = load_detector(backend, version.paths['model_subclass'], device)
+
+    models = LoadedModels(version.name, major, subclass)
+    if settings.INFERENCE_CASCADE_ENABLED:
+        models.light, models.light_thresholds = _load_light_classifier(version)
+
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
+    return models
+
+
+def _load_light_classifier(version: ModelVersion):
+    """Cascade first tier: always eager fp32, it is small enough not to need the export paths"""
+    path = version.paths.get('model_light')
+    if not path or not Path(path).exists():
+        raise FileNotFoundError(
+            f"INFERENCE_CASCADE_ENABLED is set but model version '{version.name}' has no light classifier ({path})"
+        )
+    light = load_eager_classifier(
+        path, len(CATEGORIES['model_major']), device, arch=settings.INFERENCE_CASCADE_LIGHT_ARCH
+    )
+    return light, load_thresholds(path, CATEGORIES['model_major'])
+
+
+def _warm_up(models: LoadedModels) -> None:
+    """One forward pass through both models so lazy init happens before traffic"""
+    blank = np.zeros((260, 260, 3), dtype=np.uint8)
+    predict_model_1_batch([preprocess_image(blank)], models.major, CATEGORIES['model_major'])
+    predict_model_2_batch([blank], models.subclass, CATEGORIES['model_subclass'])
+    if models.light is not None:
+        predict_model_1_batch([preprocess_light(blank)], models.light, CATEGORIES['model_major'], precision='fp32')
+
+
+# Models are loaded on first use so processes that only hand work to the
+# inference pool (see inference_pool.py) never hold a copy of the weights
+registry = ModelRegistry(
+    root=settings.MODEL_REGISTRY_DIR,
+    builtin=ModelVersion(MODEL_VERSION, MODEL_PATHS),
+    loader=_load_model_set,
+    warmup=_warm_up,
+    pinned=settings.MODEL_ACTIVE_VERSION,
+    keep_previous=settings.MODEL_KEEP_PREVIOUS,
+    drain_timeout=settings.MODEL_DRAIN_TIMEOUT,
+    poll_seconds=settings.MODEL_REGISTRY_POLL_SECONDS,
+)
+
+
+def load_models() -> None:
+    """Load the active model version into this process (no-op if already loaded)"""
+    if settings.INFERENCE_STUB_MODELS:
+        return
+    registry.load()
 
 
 # Image preprocessing for timm model
@@ -53,59 +109,206 @@ transform = transforms.Compose([
     transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
 ])
 
+# Smaller input for the cascade's light classifier
+light_transform = transforms.Compose([
+    transforms.Resize((settings.INFERENCE_CASCADE_LIGHT_INPUT_SIZE, settings.INFERENCE_CASCADE_LIGHT_INPUT_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
 # ============================================
 # PREDICTION FUNCTIONS
 # ============================================
 
-def predict_model_1(image_path: str, model, categories: list):
+def decode_image(image) -> np.ndarray:
+    """
+    Decode an image into an (H, W, 3) uint8 RGB array.
+    Accepts a file path, raw encoded bytes, a PIL image or an array (returned as-is).
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('RGB'))
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = io.BytesIO(image)
+    with observe_stage("image_decode"), Image.open(image) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def preprocess_image(image) -> torch.Tensor:
+    """Turn an image (anything decode_image accepts) into a (C, H, W) tensor for the timm model"""
+    img = Image.fromarray(decode_image(image))
+    logger.debug("model 1 image loaded", extra={"size": img.size})
+    with observe_stage("preprocess"):
+        return transform(img)
+
+
+def preprocess_light(image) -> torch.Tensor:
+    """Like preprocess_image, at the light classifier's input size"""
+    img = Image.fromarray(decode_image(image))
+    with observe_stage("preprocess"):
+        return light_transform(img)
+
+
+def _yolo_source(image):
+    """YOLO letterboxes numpy arrays directly but expects BGR channel order"""
+    return np.ascontiguousarray(decode_image(image)[..., ::-1])
+
+
+def predict_model_1_batch(img_tensors: list, model, categories: list, precision: str = None) -> list:
+    """Predict a batch of preprocessed images with one forward pass"""
+    precision = precision or settings.INFERENCE_PRECISION
+    batch = torch.stack(img_tensors).to(device, dtype=input_dtype(precision))
+    logger.debug("model 1 batch", extra={"shape": tuple(batch.shape)})
+
+    with observe_stage("model_1_forward"), torch.no_grad(), autocast_context(precision, device):
+        output = model(batch)
+        probabilities = torch.softmax(output.float(), dim=1)
+        confidences, predicted = probabilities.max(1)
+
+    results = []
+    for confidence, class_id in zip(confidences.tolist(), predicted.tolist()):
+        results.append({
+            'category': categories[class_id],
+            'confidence': float(confidence),
+            'class_id': int(class_id)
+        })
+    return results
+
+
+def predict_model_1(image, model, categories: list):
     """Predict using timm EfficientNet classification model"""
-    print(f"[DEBUG] Model 1: Loading image from {image_path}")
-    img = Image.open(image_path).convert('RGB')
-    print(f"[DEBUG] Model 1: Image loaded, size={img.size}")
-    
-    img_tensor = transform(img).unsqueeze(0).to(device)
-    print(f"[DEBUG] Model 1: Image preprocessed, tensor shape={img_tensor.shape}")
-    
-    with torch.no_grad():
-        output = model(img_tensor)
-        probabilities = torch.softmax(output, dim=1)
-        confidence, predicted = probabilities.max(1)
-    
-    class_id = int(predicted.item())
-    result = {
-        'category': categories[class_id], 
-        'confidence': float(confidence.item()),
-        'class_id': class_id
-    }
-    print(f"[DEBUG] Model 1: Prediction complete - {result}")
+    img_tensor = preprocess_image(image)
+    result = predict_model_1_batch([img_tensor], model, categories)[0]
+    logger.debug("model 1 prediction", extra=result)
     return result
 
 
-def predict_model_2(image_path: str, model, categories: list) -> dict:
-    """
-    
-    Returns the best detection (highest confidence)
-    """
-    results = model.predict(image_path, conf = 0.25, verbose = False)
-    if len(results[0].boxes) > 0:
-        confidences = results[0].boxes.conf.cpu().numpy()
+def _best_detection(result, categories: list) -> dict:
+    """Pick the highest confidence box from a single YOLO result"""
+    if len(result.boxes) > 0:
+        confidences = result.boxes.conf.cpu().numpy()
         best_idx = confidences.argmax()
         best_confidence = confidences[best_idx]
-        class_id = int(results[0].boxes.cls[best_idx].cpu().numpy())
-        result = {
-            'category': categories[class_id], 
+        class_id = int(result.boxes.cls[best_idx].cpu().numpy())
+        return {
+            'category': categories[class_id],
             'confidence': float(best_confidence),
             'class_id': class_id
         }
-        print(f"[DEBUG] Model 2: Prediction complete - {result}")
-        return result
-    else:
-        print(f"[DEBUG] Model 2: No detections found for image {image_path}")
-        return {
-            'category': 'unknown',
-            'confidence': 0.0,
-            'class_id': -1
-        }
+    return {
+        'category': 'unknown',
+        'confidence': 0.0,
+        'class_id': -1
+    }
+
+
+def predict_model_2_batch(images: list, model, categories: list, precision: str = None) -> list:
+    """Run YOLO once over a list of images, best detection per image"""
+    precision = precision or settings.INFERENCE_PRECISION
+    # only fp16 changes the YOLO stage; int8/bf16 apply to model 1
+    sources = [_yolo_source(image) for image in images]
+    with observe_stage("model_2_forward"):
+        results = model.predict(sources, conf = 0.25, verbose = False, half = precision == 'fp16')
+    return [_best_detection(result, categories) for result in results]
+
+
+def predict_model_2(image, model, categories: list) -> dict:
+    """
+    
+    Returns the best detection (highest confidence)
+    """
+    result = predict_model_2_batch([image], model, categories)[0]
+    logger.debug("model 2 prediction", extra=result)
+    return result
+
+
+# ============================================
+# MICRO-BATCHING
+# ============================================
+
+def _per_version(predict):
+    """
+    Batch function over (models, item) pairs. Items are grouped by the version
+    their request leased, so a batch that straddles a swap runs once per version.
+    """
+    def run(entries: list) -> list:
+        results = [None] * len(entries)
+        groups: dict = {}
+        for i, (models, _) in enumerate(entries):
+            groups.setdefault(id(models), (models, []))[1].append(i)
+        for models, indices in groups.values():
+            for i, result in zip(indices, predict(models, [entries[i][1] for i in indices])):
+                results[i] = result
+        return results
+    return run
+
+
+# Concurrent uploads are grouped here so each stage runs one forward pass per batch
+major_batcher = MicroBatcher(
+    'model_major',
+    _per_version(lambda models, tensors: predict_model_1_batch(tensors, models.major, CATEGORIES['model_major'])),
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+)
+# the light tier always runs fp32, INFERENCE_PRECISION applies to model_major
+light_batcher = MicroBatcher(
+    'model_light',
+    _per_version(lambda models, tensors: predict_model_1_batch(
+        tensors, models.light, CATEGORIES['model_major'], precision='fp32'
+    )),
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+)
+subclass_batcher = MicroBatcher(
+    'model_subclass',
+    _per_version(lambda models, images: predict_model_2_batch(images, models.subclass, CATEGORIES['model_subclass'])),
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+)
+
+
+speculation = SpeculativeStage(
+    enabled=settings.INFERENCE_SPECULATIVE_ENABLED,
+    workers=settings.INFERENCE_SPECULATIVE_WORKERS,
+    min_probability=settings.INFERENCE_SPECULATIVE_MIN_PROBABILITY,
+    max_load=settings.INFERENCE_SPECULATIVE_MAX_LOAD,
+    # inference pool workers set their own (threads per worker)
+    capacity=settings.INFERENCE_MAX_CONCURRENCY,
+)
+
+
+def get_model_version(version: str = None) -> str:
+    """
+    Version string stored on submissions and used to key cached results:
+    the registry version (the active one unless given), with non-default
+    backends and precisions appended, e.g. v1.0.0+onnx or v1.1.0+int8
+    """
+    base = version or registry.active_version
+    if settings.INFERENCE_STUB_MODELS:
+        # keep fake results out of the cache entries of real models
+        return f"{base}+stub"
+    tags = []
+    if settings.INFERENCE_BACKEND != 'eager':
+        tags.append(settings.INFERENCE_BACKEND)
+    if settings.INFERENCE_PRECISION != 'fp32':
+        tags.append(settings.INFERENCE_PRECISION)
+    if settings.INFERENCE_CASCADE_ENABLED:
+        tags.append('cascade')
+    if tags:
+        return f"{base}+{'-'.join(tags)}"
+    return base
+
+
+def get_batching_stats() -> dict:
+    """Batch size and queue wait metrics for both model stages"""
+    return {
+        'enabled': settings.INFERENCE_BATCHING_ENABLED,
+        'model_light': light_batcher.stats(),
+        'speculation': speculation.stats(),
+        'model_major': major_batcher.stats(),
+        'model_subclass': subclass_batcher.stats(),
+    }
 
 
 # ============================================
@@ -114,8 +317,6 @@ def predict_model_2(image_path: str, model, categories: list) -> dict:
 
 def calculate_resell_value(classification: str, material_type: str = None) -> dict:
     """Calculate resell value based on classification"""
-    print(f"[DEBUG] Calculating resell value for classification='{classification}', material_type='{material_type}'")
-    
     # Default values
     result = {
         'resell_value': 0.0,
@@ -159,46 +360,119 @@ def calculate_resell_value(classification: str, material_type: str = None) -> di
             result['resell_places'] = ['Recycling centers']
             result['recyclable'] = True
     
-    print(f"[DEBUG] Resell calculation result: {result}")
+    logger.debug("resell value", extra={"classification": classification, "material_type": material_type, **result})
     return result
 
-def predict_waste_classification(image_path: str) -> dict:
+def predict_stub(image: np.ndarray) -> dict:
+    """
+    Stand-in for both models (INFERENCE_STUB_MODELS): a fixed delay, then a
+    result derived from the pixels so the same image always gets the same answer
+    """
+    if settings.INFERENCE_STUB_LATENCY_MS > 0:
+        time.sleep(settings.INFERENCE_STUB_LATENCY_MS / 1000.0)
+    seed = int(image[::32, ::32].sum())
+    classification = CATEGORIES['model_major'][seed % len(CATEGORIES['model_major'])]
+    material_type = None
+    if classification == 'inorganic':
+        material_type = CATEGORIES['model_subclass'][seed % len(CATEGORIES['model_subclass'])]
+    return build_result(classification, 0.5 + (seed % 50) / 100.0, material_type)
+
+
+def predict_waste_classification(image) -> dict:
     """
-    Main prediction function with routing logic
+    Main prediction function with routing logic.
+    image can be a file path, encoded bytes or a decoded (H, W, 3) uint8 RGB
+    array; it is decoded once and the same buffer feeds both models.
     
     Flow:
     1. Run Model 1 (waste classification)
     2. If 'inorganic' → Run Model 2 (material classification)
     3. Return results with resell info
     """
-    print(f"\n[DEBUG] ===== Starting waste classification for: {image_path} =====")
-    
-    # Step 1: Classify as organic/inorganic/hazardous
-    print(f"[DEBUG] Step 1: Running waste classification...")
-    result1 = predict_model_1(image_path, model_major, CATEGORIES['model_major'])
-    
-    classification = result1['category']
-    confidence = result1['confidence']
-    print(f"[DEBUG] Step 1 result: classification='{classification}', confidence={confidence:.4f}")
+    load_models()
+    start_trace()
+    logger.debug("classification started", extra={"source": image if isinstance(image, str) else type(image).__name__})
+    with server_timing("decode"):
+        image = decode_image(image)
+    if settings.INFERENCE_STUB_MODELS:
+        return predict_stub(image)
     
-    # Step 2: If inorganic, get detailed material type
-    material_type = None
-    material_confidence = None 
-    
-    if classification == 'inorganic':
-        print(f"[DEBUG] Step 2: Detected inorganic waste, running material detection...")
-        result2 = predict_model_2(image_path, model_subclass, CATEGORIES['model_subclass'])
-        material_type = result2['category']
-        material_confidence = result2['confidence']
-        print(f"[DEBUG] Step 2 result: material_type='{material_type}', confidence={(material_confidence if material_confidence else 0):.4f}")
-    else:
-        print(f"[DEBUG] Step 2: Skipped (classification is '{classification}', not inorganic)")
+    # the leased version serves both stages even if a swap happens meanwhile
+    with registry.lease() as models, speculation.track():
+        speculative = _start_speculative_stage_2(models, image)
+
+        # Step 1: Classify as organic/inorganic/hazardous
+        # (timed from the caller's side so batcher queue wait is included)
+        with server_timing("model1"):
+            result1 = _predict_stage_1(models, image)
+        
+        classification = result1['category']
+        confidence = result1['confidence']
+        speculation.observe(classification == 'inorganic')
+        
+        # Step 2: If inorganic, get detailed material type
+        material_type = None
+        material_confidence = None 
+        
+        if classification == 'inorganic':
+            with server_timing("model2"):
+                if speculative is not None:
+                    result2 = speculation.take(speculative)
+                else:
+                    result2 = _predict_stage_2(models, image)
+            material_type = result2['category']
+            material_confidence = result2['confidence']
+        elif speculative is not None:
+            speculation.discard(speculative)
     
     # Step 3: Calculate resell value and CO2 saved
-    print(f"[DEBUG] Step 3: Calculating resell value and environmental impact...")
-    resell_data = calculate_resell_value(classification, material_type)
-    
-    final_result = {
+    final_result = build_result(classification, confidence, material_type, version=models.version)
+    logger.debug("classification finished", extra={"material_confidence": material_confidence, **final_result})
+    return final_result
+
+
+def _predict_stage_1(models: LoadedModels, image: np.ndarray) -> dict:
+    """Light classifier first when the cascade is on; model_major only for items it is unsure about"""
+    if models.light is not None:
+        if settings.INFERENCE_BATCHING_ENABLED:
+            light = light_batcher.submit((models, preprocess_light(image)))
+        else:
+            light = predict_model_1_batch(
+                [preprocess_light(image)], models.light, CATEGORIES['model_major'], precision='fp32'
+            )[0]
+        confident = accept(light, models.light_thresholds)
+        cascade_stats.record(light['category'], confident)
+        if confident:
+            return light
+
+    if settings.INFERENCE_BATCHING_ENABLED:
+        return major_batcher.submit((models, preprocess_image(image)))
+    return predict_model_1(image, models.major, CATEGORIES['model_major'])
+
+
+def _predict_stage_2(models: LoadedModels, image: np.ndarray) -> dict:
+    if settings.INFERENCE_BATCHING_ENABLED:
+        return subclass_batcher.submit((models, image))
+    return predict_model_2(image, models.subclass, CATEGORIES['model_subclass'])
+
+
+def _start_speculative_stage_2(models: LoadedModels, image: np.ndarray):
+    """Model 2 on a speculation thread, or None when speculation is off, unlikely to pay or busy"""
+    # the run holds its own lease: a discarded one may outlive the request
+    models.acquire()
+    future = speculation.maybe_start(lambda: _predict_stage_2(models, image), inference_admission.load)
+    if future is None:
+        models.release()
+    else:
+        future.add_done_callback(lambda _: models.release())
+    return future
+
+
+def build_result(classification: str, confidence: float, material_type: str = None, version: str = None) -> dict:
+    """Final pipeline result dict with resell info attached"""
+    with observe_stage("resell_calculation"):
+        resell_data = calculate_resell_value(classification, material_type)
+    return {
         'classification': classification,
         'confidence': confidence,
         'material_type': material_type,
@@ -206,8 +480,74 @@ def predict_waste_classification(image_path: str) -> dict:
         'co2_saved': resell_data['co2_saved'],
         'resell_places': resell_data['resell_places'],
         'recyclable': resell_data['recyclable'],
-        'model_version': 'v1.0.0'
+        'model_version': get_model_version(version)
     }
-    print(f"[DEBUG] ===== Final result: {final_result} =====\n")
-    return final_result
+
+
+def predict_waste_classification_batch(images: list) -> list:
+    """
+    Run the two-stage pipeline over a whole set of images as real tensor batches.
+    Model 1 sees every image in chunks of INFERENCE_MAX_BATCH_SIZE, model 2 only
+    the inorganic ones. Returns one entry per image, in order: a result dict,
+    or the exception raised while decoding that image.
+    """
+    load_models()
+    start_trace()
+    chunk = max(1, settings.INFERENCE_MAX_BATCH_SIZE)
+
+    outcomes: list = [None] * len(images)
+    decoded = {}
+    with server_timing("decode"):
+        for i, image in enumerate(images):
+            try:
+                decoded[i] = decode_image(image)
+            except Exception as e:
+                outcomes[i] = e
+
+    # Step 1: every decodable image through model 1
+    indices = list(decoded)
+    if settings.INFERENCE_STUB_MODELS:
+        for i in indices:
+            outcomes[i] = predict_stub(decoded[i])
+        return outcomes
+    stage1 = {}
+    stage2 = {}
+    with registry.lease() as models:
+        with server_timing("model1"):
+            escalate = indices
+            if models.light is not None:
+                escalate = []
+                for start in range(0, len(indices), chunk):
+                    part = indices[start:start + chunk]
+                    tensors = [preprocess_light(decoded[i]) for i in part]
+                    light = predict_model_1_batch(tensors, models.light, CATEGORIES['model_major'], precision='fp32')
+                    for i, result in zip(part, light):
+                        confident = accept(result, models.light_thresholds)
+                        cascade_stats.record(result['category'], confident)
+                        if confident:
+                            stage1[i] = result
+                        else:
+                            escalate.append(i)
+
+            for start in range(0, len(escalate), chunk):
+                part = escalate[start:start + chunk]
+                tensors = [preprocess_image(decoded[i]) for i in part]
+                for i, result in zip(part, predict_model_1_batch(tensors, models.major, CATEGORIES['model_major'])):
+                    stage1[i] = result
+
+        # Step 2: inorganic images through model 2
+        inorganic = [i for i in indices if stage1[i]['category'] == 'inorganic']
+        with server_timing("model2"):
+            for start in range(0, len(inorganic), chunk):
+                part = inorganic[start:start + chunk]
+                batch = [decoded[i] for i in part]
+                for i, result in zip(part, predict_model_2_batch(batch, models.subclass, CATEGORIES['model_subclass'])):
+                    stage2[i] = result
+    logger.debug("batch classified", extra={"model_1_images": len(indices), "model_2_images": len(inorganic)})
+
+    # Step 3: resell info per image
+    for i in indices:
+        material_type = stage2[i]['category'] if i in stage2 else None
+        outcomes[i] = build_result(stage1[i]['category'], stage1[i]['confidence'], material_type, version=models.version)
+    return outcomes
 
@@ -1,27 +1,71 @@
-from app.utils.ml_core_logic import predict_waste_classification
+from concurrent.futures import ThreadPoolExecutor
 
+from app.core.log import get_logger
+from app.utils.inference_pool import inference_pool
+from app.utils.metrics import server_timing
+from app.utils.ml_core_logic import (
+    decode_image,
+    get_model_version,
+    predict_waste_classification,
+    predict_waste_classification_batch,
+)
 
-def process_with_ml_model(file_path: str) -> dict:
+logger = get_logger(__name__)
+
+
+def process_with_ml_model(image) -> dict:
     """
     Process image with ML models and return classification results.
     Calls the two-stage ML pipeline:
       1. EfficientNet-B2 → organic / inorganic / hazardous
       2. YOLO (if inorganic) → material type (PET_bottle, Aluminum_Cans, etc.)
     Then attaches resell value, CO2 saved, and recyclability info.
+    image may be a file path or the uploaded bytes; either way it is
+    decoded exactly once. When the inference pool is started the image is
+    decoded here and classified in a worker process (an error result while
+    no worker is alive, the models are never loaded into this process).
     """
     try:
-        result = predict_waste_classification(file_path)
+        if inference_pool.started:
+            with server_timing("decode"):
+                image = decode_image(image)
+            with server_timing("inference"):
+                return inference_pool.predict(image)
+        result = predict_waste_classification(image)
         return result
     except Exception as e:
-        print(f"Error in ML prediction: {e}")
-        return {
-            "classification": "unknown",
-            "confidence": 0.0,
-            "material_type": None,
-            "resell_value": 0.0,
-            "co2_saved": 0.0,
-            "resell_places": [],
-            "recyclable": False,
-            "model_version": "v1.0.0",
-            "error": str(e)
-        }
\ No newline at end of file
+        logger.exception("Error in ML prediction")
+        return _error_result(e)
+
+
+def process_with_ml_model_batch(images: list) -> list:
+    """
+    Batch version of process_with_ml_model: one result dict per image, in order.
+    Images that fail get the same fallback dict with an "error" key, so one
+    bad file does not fail the rest of the batch.
+    """
+    try:
+        if inference_pool.started:
+            # the worker processes batch concurrent jobs themselves
+            with ThreadPoolExecutor(max_workers=min(len(images), inference_pool.num_workers * 4) or 1) as executor:
+                return list(executor.map(process_with_ml_model, images))
+        outcomes = predict_waste_classification_batch(images)
+    except Exception as e:
+        logger.exception("Error in batch ML prediction")
+        return [_error_result(e) for _ in images]
+
+    return [_error_result(o) if isinstance(o, Exception) else o for o in outcomes]
+
+
+def _error_result(e: Exception) -> dict:
+    return {
+        "classification": "unknown",
+        "confidence": 0.0,
+        "material_type": None,
+        "resell_value": 0.0,
+        "co2_saved": 0.0,
+        "resell_places": [],
+        "recyclable": False,
+        "model_version": get_model_version(),
+        "error": str(e)
+    }
\ No newline at end of file
@@ -0,0 +1,365 @@
+"""
+Versioned model registry with hot swapping.
+
+Each version is a folder under MODEL_REGISTRY_DIR holding the same files as
+app/utils/ (model_major.pt, model2.pt and any exported/quantized artifacts):
+
+    app/utils/models/v1.1.0/model_major.pt
+    app/utils/models/v1.1.0/model2.pt
+    app/utils/models/v1.1.0/model_light.pt   (optional, cascade first tier)
+
+The weights in app/utils/ are always available as the built-in version.
+Folder names must be short version strings (letters, digits, '.', '_', '-',
+at most MAX_VERSION_NAME_LENGTH characters): the name plus its backend /
+precision tags is stored in String(50) model_version columns.
+Activating a version loads and warms it up next to the serving one, then
+swaps it in under a lock; requests already running keep the version they
+started with, and the old version is released once they have drained.
+The previously active version stays loaded so rollback is an instant swap.
+
+The active version (first line) and the versions it replaced are written to
+MODEL_REGISTRY_DIR/ACTIVE, so rollback also works after a restart. Other
+processes (uvicorn workers, the inference pool) poll that file and follow
+on their own, loading in the background as well.
+"""
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+MAJOR_WEIGHTS = "model_major.pt"
+SUBCLASS_WEIGHTS = "model2.pt"
+LIGHT_WEIGHTS = "model_light.pt"
+
+# leaves room for the longest tag suffix get_model_version() appends
+# ("+torchscript-int8-dynamic-cascade") within the String(50) columns
+MAX_VERSION_NAME_LENGTH = 16
+VERSION_NAME_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def valid_version_name(name: str) -> bool:
+    return len(name) <= MAX_VERSION_NAME_LENGTH and VERSION_NAME_PATTERN.fullmatch(name) is not None
+
+
+class UnknownModelVersion(Exception):
+    pass
+
+
+class ActivationInProgress(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    name: str
+    paths: dict
+
+
+@dataclass
+class LoadedModels:
+    """One loaded version; leases count the requests currently using it"""
+    version: str
+    major: Any
+    subclass: Any
+    # cascade first tier and its per-class acceptance thresholds, None when the cascade is off
+    light: Any = None
+    light_thresholds: dict = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+    _leases: int = 0
+    _retired: bool = False
+    _cond: threading.Condition = field(default_factory=threading.Condition)
+
+    def acquire(self) -> None:
+        with self._cond:
+            self._leases += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._leases -= 1
+            if self._leases == 0:
+                if self._retired:
+                    self._unload()
+                self._cond.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Drop the weights once no request uses this version. Returns False if
+        requests are still running after timeout; the last one to finish then
+        drops them instead.
+        """
+        with self._cond:
+            self._retired = True
+            drained = self._cond.wait_for(lambda: self._leases == 0, timeout=timeout)
+            if drained:
+                self._unload()
+        return drained
+
+    def _unload(self) -> None:
+        self.major = self.subclass = self.light = None
+
+    @property
+    def in_flight(self) -> int:
+        with self._cond:
+            return self._leases
+
+
+class ModelRegistry:
+    """
+    Tracks the available versions and which one new requests use.
+
+    loader(ModelVersion) -> LoadedModels loads both models, warmup(LoadedModels)
+    runs them once so the first real request does not pay for lazy init.
+    A process only loads weights once load() has been called in it; until
+    then activate() just switches the version name (used by the API process
+    when inference runs in the pool).
+    """
+
+    def __init__(self, root: str, builtin: ModelVersion, loader: Callable, warmup: Callable,
+                 pinned: str = "", keep_previous: bool = True, drain_timeout: float = 60.0,
+                 poll_seconds: float = 5.0):
+        self.root = Path(root)
+        self.builtin = builtin
+        self.loader = loader
+        self.warmup = warmup
+        self.keep_previous = keep_previous
+        self.drain_timeout = drain_timeout
+        self.poll_seconds = poll_seconds
+
+        self._lock = threading.Lock()
+        self._activation_lock = threading.Lock()
+        self._current: Optional[LoadedModels] = None
+        self._previous: Optional[LoadedModels] = None
+        saved, history = self._read_active_file()
+        self._active_version = pinned or saved or builtin.name
+        self._history: list[str] = history
+        self._activating: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._last_poll = time.monotonic()
+        self._invalid_reported: set[str] = set()
+
+    # ---------------- versions ----------------
+
+    def versions(self) -> dict[str, ModelVersion]:
+        found = {self.builtin.name: self.builtin}
+        if self.root.is_dir():
+            for folder in sorted(self.root.iterdir()):
+                major, subclass = folder / MAJOR_WEIGHTS, folder / SUBCLASS_WEIGHTS
+                if not (folder.is_dir() and major.exists() and subclass.exists()):
+                    continue
+                if not valid_version_name(folder.name):
+                    if folder.name not in self._invalid_reported:
+                        self._invalid_reported.add(folder.name)
+                        logger.warning("Ignoring model version with an invalid name", extra={
+                            "version": folder.name, "max_length": MAX_VERSION_NAME_LENGTH
+                        })
+                    continue
+                found[folder.name] = ModelVersion(folder.name, {
+                    "model_major": str(major),
+                    "model_subclass": str(subclass),
+                    "model_light": str(folder / LIGHT_WEIGHTS),
+                })
+        return found
+
+    def get_version(self, name: str) -> ModelVersion:
+        version = self.versions().get(name)
+        if version is None:
+            if not valid_version_name(name):
+                raise UnknownModelVersion(
+                    f"Invalid model version name '{name}' (letters, digits, '.', '_', '-', "
+                    f"at most {MAX_VERSION_NAME_LENGTH} characters)"
+                )
+            raise UnknownModelVersion(f"Unknown model version '{name}'")
+        return version
+
+    @property
+    def active_version(self) -> str:
+        self.refresh()
+        return self._active_version
+
+    # ---------------- serving ----------------
+
+    def load(self) -> LoadedModels:
+        """Load the active version into this process (no-op if already loaded)"""
+        with self._activation_lock:
+            if self._current is None:
+                models = self._load(self.get_version(self._active_version))
+                with self._lock:
+                    self._current = models
+        return self._current
+
+    @contextmanager
+    def lease(self):
+        """The current version, held for the duration of the block so a swap cannot unload it"""
+        self.refresh()
+        with self._lock:
+            models = self._current
+            if models is not None:
+                models.acquire()
+        if models is None:
+            models = self.load()
+            models.acquire()
+        try:
+            yield models
+        finally:
+            models.release()
+
+    # ---------------- switching ----------------
+
+    def activate(self, name: str, persist: bool = True, history: Optional[list] = None) -> None:
+        """
+        Load + warm up name, then switch new requests to it. Blocks until done.
+        history replaces the rollback history instead of extending it (followers).
+        """
+        version = self.get_version(name)
+        if not self._activation_lock.acquire(blocking=False):
+            raise ActivationInProgress(f"Activation of '{self._activating}' is still running")
+        try:
+            self._activating = name
+            self._last_error = None
+            self._switch(version, persist, history)
+        except Exception as e:
+            self._last_error = f"{name}: {type(e).__name__}: {e}"
+            logger.exception("Model activation failed", extra={"version": name})
+            raise
+        finally:
+            self._activating = None
+            self._activation_lock.release()
+
+    def activate_in_background(self, name: str, persist: bool = True, history: Optional[list] = None) -> None:
+        """activate() on a thread; progress and errors show up in status()"""
+        self.get_version(name)
+        if self._activation_lock.locked():
+            raise ActivationInProgress(f"Activation of '{self._activating}' is still running")
+
+        def run() -> None:
+            try:
+                self.activate(name, persist, history)
+            except Exception:
+                # recorded in status() by activate()
+                pass
+
+        threading.Thread(target=run, name=f"model-activate-{name}", daemon=True).start()
+
+    def rollback(self) -> str:
+        """Switch back to the version that was active before the current one"""
+        with self._lock:
+            if not self._history:
+                raise UnknownModelVersion("No previous model version to roll back to")
+            target = self._history[-1]
+        self.activate(target)
+        with self._lock:
+            # activate() pushed the version we left; a rollback consumes both entries
+            self._history = self._history[:-2]
+        self._write_active_file()
+        return target
+
+    def _switch(self, version: ModelVersion, persist: bool, history: Optional[list]) -> None:
+        previous_name = self._active_version
+        if version.name == previous_name:
+            return
+
+        retired = None
+        if self._current is None:
+            # this process does not serve the models itself, just track the name
+            with self._lock:
+                self._active_version = version.name
+        else:
+            if self._previous is not None and self._previous.version == version.name:
+                models = self._previous
+            else:
+                models = self._load(version)
+            with self._lock:
+                old, self._current, self._active_version = self._current, models, version.name
+                retired = self._previous if self._previous is not models else None
+                self._previous = old if self.keep_previous else None
+                if not self.keep_previous:
+                    retired = old
+
+        with self._lock:
+            if history is not None:
+                self._history = history
+            else:
+                self._history.append(previous_name)
+        if persist:
+            self._write_active_file()
+        logger.info("Model version activated", extra={"version": version.name, "previous": previous_name})
+
+        if retired is not None:
+            threading.Thread(target=self._retire, args=(retired,), daemon=True).start()
+
+    def _retire(self, models: LoadedModels) -> None:
+        if not models.drain(self.drain_timeout):
+            logger.warning("Retired model version still in use, weights kept until its requests finish",
+                           extra={"version": models.version, "in_flight": models.in_flight})
+
+    def _load(self, version: ModelVersion) -> LoadedModels:
+        started = time.perf_counter()
+        models = self.loader(version)
+        self.warmup(models)
+        logger.info("Model version loaded", extra={
+            "version": version.name, "seconds": round(time.perf_counter() - started, 3)
+        })
+        return models
+
+    # ---------------- cross-process ----------------
+
+    def refresh(self) -> None:
+        """Follow activations made by other processes (at most every poll_seconds)"""
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_seconds:
+            return
+        self._last_poll = now
+        wanted, history = self._read_active_file()
+        if not wanted or wanted == self._active_version or self._activation_lock.locked():
+            return
+        if wanted not in self.versions():
+            return
+        try:
+            self.activate_in_background(wanted, persist=False, history=history)
+        except ActivationInProgress:
+            pass
+
+    @property
+    def _active_file(self) -> Path:
+        return self.root / "ACTIVE"
+
+    def _read_active_file(self) -> tuple[Optional[str], list[str]]:
+        """(active version, versions it replaced oldest first)"""
+        try:
+            lines = self._active_file.read_text().split()
+        except OSError:
+            return None, []
+        if not lines:
+            return None, []
+        return lines[0], lines[:0:-1]
+
+    def _write_active_file(self) -> None:
+        with self._lock:
+            lines = [self._active_version] + self._history[::-1]
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._active_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text("\n".join(lines) + "\n")
+        os.replace(tmp, self._active_file)
+
+    def status(self) -> dict:
+        with self._lock:
+            current, previous = self._current, self._previous
+            history = list(self._history)
+        return {
+            "active": self._active_version,
+            "loaded": current.version if current else None,
+            "in_flight": current.in_flight if current else 0,
+            "previous": previous.version if previous else None,
+            "rollback_to": history[-1] if history else None,
+            "activating": self._activating,
+            "last_error": self._last_error,
+            "versions": sorted(self.versions()),
+        }
@@ -0,0 +1,23 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, submission_id: uuid.UUID) -> str:
+    """Opaque keyset cursor pointing just past (created_at, id)"""
+    payload = json.dumps({"c": created_at.isoformat(), "i": str(submission_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), uuid.UUID(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core import security
+from app.core.config import settings
+from app.utils.admission import AdmissionRejected
+
+
+class PasswordHasher:
+    """
+    Runs Argon2 hashing / verification on a small dedicated executor.
+
+    Hashing is deliberately slow and CPU-heavy; on the shared threadpool a
+    burst of logins would hold the threads uploads and stats requests need.
+    Here at most `workers` hashes run at once and at most `max_queue` wait,
+    anything beyond that is rejected with AdmissionRejected.
+    """
+
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._latencies = deque(maxlen=1024)  # seconds, most recent operations
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(valid, new hash or None) - new hash when the stored one uses outdated parameters"""
+        valid, new_hash = await self._run(security.verify_and_update_password, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self._rehashed += 1
+        return valid, new_hash
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise AdmissionRejected("Too many password checks in progress", self.retry_after)
+            self._pending += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._timed, fn, args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _timed(self, fn, args):
+        with self._lock:
+            self._active += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._latencies.append(elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queue_depth": self._pending - self._active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "avg_hash_ms": (sum(latencies) / len(latencies) * 1000.0) if latencies else 0.0,
+                "p95_hash_ms": latencies[int(len(latencies) * 0.95)] * 1000.0 if latencies else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER,
+)
@@ -0,0 +1,120 @@
+import contextlib
+import json
+from pathlib import Path
+from typing import Callable, Iterable
+
+import torch
+
+# fp32         - default, no conversion
+# int8         - static post-training quantization of model 1 (needs a calibrated artifact)
+# int8-dynamic - dynamic quantization of model 1's linear layers, no calibration
+# bf16         - bfloat16 autocast on CPUs with native bf16 support
+# fp16         - half precision weights and inputs, CUDA only
+# The YOLO stage only follows fp16 (ultralytics half=True); it stays fp32 otherwise.
+PRECISIONS = ("fp32", "int8", "int8-dynamic", "bf16", "fp16")
+
+INT8_SUFFIX = ".int8.pt"
+# written by `python -m app.utils.quantize_models`
+DRIFT_REPORT_PATH = Path("app/utils/precision_report.json")
+
+
+def int8_artifact_path(weights_path: str) -> Path:
+    """Calibrated int8 TorchScript module stored next to the fp32 weights"""
+    path = Path(weights_path)
+    return path.with_name(path.stem + INT8_SUFFIX)
+
+
+def cpu_supports_bf16() -> bool:
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def validate_precision(precision: str, backend: str, device: str) -> None:
+    """Fail at startup instead of silently running a different precision than configured"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown inference precision '{precision}', expected one of {PRECISIONS}")
+    if precision == "fp32":
+        return
+    if backend != "eager":
+        raise ValueError(f"INFERENCE_PRECISION={precision} is only supported with INFERENCE_BACKEND=eager")
+    if precision in ("int8", "int8-dynamic") and device != "cpu":
+        raise ValueError(f"INFERENCE_PRECISION={precision} runs on CPU only")
+    if precision == "bf16" and device == "cpu" and not cpu_supports_bf16():
+        raise ValueError("INFERENCE_PRECISION=bf16 but this CPU has no native bf16 support")
+    if precision == "fp16" and device != "cuda":
+        raise ValueError("INFERENCE_PRECISION=fp16 requires CUDA")
+
+
+def apply_classifier_precision(model: torch.nn.Module, precision: str, weights_path: str):
+    """Convert a loaded fp32 model 1 to the requested precision"""
+    if precision == "int8":
+        path = int8_artifact_path(weights_path)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"{path} not found, run `python -m app.utils.quantize_models --calibration-dir <images>` first"
+            )
+        quantized = torch.jit.load(str(path), map_location="cpu")
+        quantized.eval()
+        return quantized
+    if precision == "int8-dynamic":
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if precision == "fp16":
+        return model.half()
+    return model
+
+
+def get_drift_report(precision: str) -> dict | None:
+    """Recorded accuracy drift of a precision mode against fp32, if it has been measured"""
+    if precision == "fp32" or not DRIFT_REPORT_PATH.exists():
+        return None
+    report = json.loads(DRIFT_REPORT_PATH.read_text())
+    return report.get("modes", {}).get(precision)
+
+
+def input_dtype(precision: str) -> torch.dtype:
+    return torch.float16 if precision == "fp16" else torch.float32
+
+
+def autocast_context(precision: str, device: str):
+    """bf16 runs through autocast; other modes change weights/inputs up front"""
+    if precision == "bf16":
+        return torch.autocast(device_type=device, dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
+def calibrate_int8(model: torch.nn.Module, batches: Iterable[torch.Tensor]) -> torch.nn.Module:
+    """
+    Static post-training quantization (FX graph mode) of model 1.
+    Observers are calibrated on the given batches, then the model is converted
+    and traced so it can be saved and reloaded without the FX tooling.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    model = model.cpu().eval()
+    example = None
+    qconfig_mapping = get_default_qconfig_mapping("x86")
+
+    prepared = None
+    with torch.no_grad():
+        for batch in batches:
+            if prepared is None:
+                example = batch[:1]
+                prepared = prepare_fx(model, qconfig_mapping, example_inputs=(example,))
+            prepared(batch)
+
+    if prepared is None:
+        raise ValueError("No calibration images given")
+
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, example)
+    return torch.jit.freeze(traced.eval())
+
+
+def batched(items: list, size: int, fn: Callable) -> Iterable[torch.Tensor]:
+    """Yield stacked tensors of fn(item) in chunks of size"""
+    for start in range(0, len(items), size):
+        yield torch.stack([fn(item) for item in items[start:start + size]])
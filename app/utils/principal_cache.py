@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class PrincipalCache:
+    """
+    In-process TTL/LRU cache for get_current_user.
+
+    Two maps, both bounded by max_entries:
+      token    -> username, so a repeat token skips JWT verification
+                  (never kept past the token's own exp)
+      username -> column values of the User row, so a repeat user skips the DB lookup
+    User rows are invalidated by the after_update / after_delete mapper events
+    below; changes made by other processes are picked up after at most ttl seconds.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+
+        self._tokens: OrderedDict = OrderedDict()
+        self._users: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._token_hits = 0
+        self._token_misses = 0
+        self._user_hits = 0
+        self._user_misses = 0
+        self._invalidations = 0
+
+    def get_subject(self, token: str) -> Optional[str]:
+        """Username of an already verified token"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            username = self._lookup(self._tokens, token)
+            if username is None:
+                self._token_misses += 1
+            else:
+                self._token_hits += 1
+            return username
+
+    def remember_token(self, token: str, username: str, exp: Optional[float]) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            self._remember(self._tokens, token, username, ttl)
+
+    def get_user(self, username: str) -> Optional[dict]:
+        """Column values of the user, to be merged into the caller's session"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            values = self._lookup(self._users, username)
+            if values is None:
+                self._user_misses += 1
+            else:
+                self._user_hits += 1
+            return values
+
+    def remember_user(self, user: User) -> None:
+        if not self.enabled:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        self._remember(self._users, user.username, values, self.ttl)
+
+    def invalidate_user(self, username: str) -> None:
+        with self._lock:
+            if self._users.pop(username, None) is not None:
+                self._invalidations += 1
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def _lookup(self, entries: OrderedDict, key):
+        # caller holds the lock
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return value
+
+    def _remember(self, entries: OrderedDict, key, value, ttl: float) -> None:
+        with self._lock:
+            entries[key] = (time.monotonic() + ttl, value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            user_lookups = self._user_hits + self._user_misses
+            token_lookups = self._token_hits + self._token_misses
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "tokens": len(self._tokens),
+                "users": len(self._users),
+                "token_hits": self._token_hits,
+                "token_misses": self._token_misses,
+                "token_hit_rate": (self._token_hits / token_lookups) if token_lookups else 0.0,
+                "user_hits": self._user_hits,
+                "user_misses": self._user_misses,
+                "hit_rate": (self._user_hits / user_lookups) if user_lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    enabled=settings.AUTH_CACHE_ENABLED,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User) -> None:
+    # drop the old name too when the username itself changed
+    history = inspect(target).attrs.username.history
+    for username in {target.username, *history.deleted}:
+        principal_cache.invalidate_user(username)
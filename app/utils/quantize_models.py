@@ -0,0 +1,147 @@
+"""
+Calibrate int8 model 1 and measure accuracy drift of each precision mode against fp32.
+
+Usage:
+    python -m app.utils.quantize_models --calibration-dir samples/calib --eval-dir samples/eval
+    python -m app.utils.quantize_models --version v1.1.0 --calibration-dir samples/calib
+
+Writes the calibrated int8 module next to model_major.pt (model_major.int8.pt)
+of the registry version given by --version (default: the active one), and a
+drift report to app/utils/precision_report.json. Modes the current
+machine cannot run (bf16 without CPU support, fp16 without CUDA) are skipped.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import torch
+
+from app.utils.inference_backends import load_eager_classifier, load_eager_detector
+from app.utils.ml_core_logic import (
+    CATEGORIES,
+    predict_model_1_batch,
+    predict_model_2_batch,
+    preprocess_image,
+    registry,
+)
+from app.utils.precision import (
+    DRIFT_REPORT_PATH,
+    PRECISIONS,
+    apply_classifier_precision,
+    batched,
+    calibrate_int8,
+    int8_artifact_path,
+    validate_precision,
+)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def list_images(folder: Path) -> list[Path]:
+    return sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def load_fp32_classifier(paths: dict, device: str):
+    return load_eager_classifier(paths['model_major'], len(CATEGORIES['model_major']), device)
+
+
+def measure_drift(precision: str, paths: dict, device: str, images: list[Path], reference: dict,
+                  batch_size: int) -> dict:
+    """Top-1 agreement and confidence difference of one mode against the fp32 reference"""
+    major = apply_classifier_precision(load_fp32_classifier(paths, device), precision, paths['model_major'])
+    subclass = load_eager_detector(paths['model_subclass'], device)
+
+    major_results = []
+    for batch in batched(images, batch_size, lambda p: preprocess_image(str(p))):
+        major_results.extend(
+            predict_model_1_batch(list(batch), major, CATEGORIES['model_major'], precision=precision)
+        )
+    subclass_results = predict_model_2_batch(
+        [str(p) for p in images], subclass, CATEGORIES['model_subclass'], precision=precision
+    )
+
+    def compare(actual: list, expected: list) -> dict:
+        agree = sum(a['category'] == e['category'] for a, e in zip(actual, expected))
+        diffs = [abs(a['confidence'] - e['confidence']) for a, e in zip(actual, expected)]
+        return {
+            "top1_agreement": agree / len(expected),
+            "mean_abs_confidence_diff": sum(diffs) / len(diffs),
+            "max_abs_confidence_diff": max(diffs),
+        }
+
+    return {
+        "model_major": compare(major_results, reference["model_major"]),
+        "model_subclass": compare(subclass_results, reference["model_subclass"]),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibration-dir", type=Path, help="Images used to calibrate int8 observers")
+    parser.add_argument("--eval-dir", type=Path, help="Images used to measure drift (defaults to --calibration-dir)")
+    parser.add_argument("--modes", nargs="+", default=[p for p in PRECISIONS if p != "fp32"],
+                        choices=[p for p in PRECISIONS if p != "fp32"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--version", help="Registry version to quantize (default: the active one)")
+    args = parser.parse_args()
+
+    version = registry.get_version(args.version or registry.active_version)
+    paths = version.paths
+    print(f"Model version {version.name}")
+
+    if args.calibration_dir:
+        calibration_images = list_images(args.calibration_dir)
+        print(f"Calibrating int8 model_major on {len(calibration_images)} images...")
+        quantized = calibrate_int8(
+            load_fp32_classifier(paths, 'cpu'),
+            batched(calibration_images, args.batch_size, lambda p: preprocess_image(str(p))),
+        )
+        quantized.save(str(int8_artifact_path(paths['model_major'])))
+        print(f"Saved {int8_artifact_path(paths['model_major'])}")
+
+    eval_dir = args.eval_dir or args.calibration_dir
+    if eval_dir is None:
+        print("No --eval-dir or --calibration-dir given, skipping drift measurement")
+        return 0
+
+    images = list_images(eval_dir)
+    if not images:
+        print(f"No images found in {eval_dir}")
+        return 1
+
+    # fp32 on CPU is the reference for every mode
+    fp32_major = load_fp32_classifier(paths, 'cpu')
+    fp32_subclass = load_eager_detector(paths['model_subclass'], 'cpu')
+    reference = {"model_major": [], "model_subclass": []}
+    for batch in batched(images, args.batch_size, lambda p: preprocess_image(str(p))):
+        reference["model_major"].extend(
+            predict_model_1_batch(list(batch), fp32_major, CATEGORIES['model_major'], precision='fp32')
+        )
+    reference["model_subclass"] = predict_model_2_batch(
+        [str(p) for p in images], fp32_subclass, CATEGORIES['model_subclass'], precision='fp32'
+    )
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "model_version": version.name,
+        "eval_images": len(images),
+        "modes": {},
+    }
+    for precision in args.modes:
+        device = 'cuda' if precision == 'fp16' and torch.cuda.is_available() else 'cpu'
+        try:
+            validate_precision(precision, 'eager', device)
+            report["modes"][precision] = measure_drift(precision, paths, device, images, reference, args.batch_size)
+        except (ValueError, FileNotFoundError, RuntimeError) as e:
+            report["modes"][precision] = {"skipped": str(e)}
+        print(f"{precision}: {report['modes'][precision]}")
+
+    DRIFT_REPORT_PATH.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {DRIFT_REPORT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.classification_cache import ClassificationCache
+
+
+def content_hash(data: bytes) -> str:
+    """sha256 hex digest of the uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of classification results keyed by (content hash, model version).
+
+    Tier 1 is an in-process LRU bounded by max_entries with a per-entry TTL.
+    Tier 2 is the classification_cache table, which survives restarts and is
+    shared between API processes; rows older than the TTL count as misses and
+    are overwritten by the next put. DB reads and writes go through the
+    caller's session so they commit together with the submission.
+
+    hit_count is bumped in batches (at most every hit_flush_seconds, with the
+    next lookup that has a session) so a cache hit is read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400, enabled: bool = True,
+                 hit_flush_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self.hit_flush_seconds = hit_flush_seconds
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._unflushed_hits: Counter = Counter()
+        self._last_hit_flush = time.monotonic()
+
+    def get(self, db: Optional[Session], digest: str, model_version: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        key = (digest, model_version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._memory_hits += 1
+                    return dict(result)
+                del self._entries[key]
+                self._evictions += 1
+
+        result = None
+        if db is not None:
+            result = db.execute(
+                select(ClassificationCache.result).where(
+                    ClassificationCache.content_hash == digest,
+                    ClassificationCache.model_version == model_version,
+                    ClassificationCache.created_at > self._db_cutoff(),
+                )
+            ).scalar_one_or_none()
+
+        if result is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        self._remember(key, result)
+        with self._lock:
+            self._db_hits += 1
+            self._unflushed_hits[key] += 1
+        self._flush_hits(db)
+        return dict(result)
+
+    def put(self, db: Optional[Session], digest: str, model_version: str, result: dict) -> None:
+        """Store a successful result; failed runs (with an 'error' key) are never cached"""
+        if not self.enabled or result.get("error"):
+            return
+
+        self._remember((digest, model_version), result)
+        if db is not None:
+            # concurrent uploads of the same image may race here, first one wins;
+            # an expired row is replaced
+            statement = insert(ClassificationCache).values(
+                content_hash=digest, model_version=model_version, result=result
+            )
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["content_hash", "model_version"],
+                set_={"result": statement.excluded.result, "created_at": func.now(), "hit_count": 0},
+                where=ClassificationCache.created_at <= self._db_cutoff(),
+            ))
+
+    def _db_cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+
+    def _flush_hits(self, db: Session) -> None:
+        """Add the DB hits counted since the last flush to hit_count, one statement per flush"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_hit_flush < self.hit_flush_seconds or not self._unflushed_hits:
+                return
+            hits, self._unflushed_hits = self._unflushed_hits, Counter()
+            self._last_hit_flush = now
+
+        table = ClassificationCache.__table__
+        db.execute(
+            update(table)
+            .where(table.c.content_hash == bindparam("b_hash"), table.c.model_version == bindparam("b_version"))
+            .values(hit_count=table.c.hit_count + bindparam("b_hits")),
+            [
+                {"b_hash": digest, "b_version": version, "b_hits": count}
+                for (digest, version), count in hits.items()
+            ],
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: tuple, result: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._memory_hits + self._db_hits
+            lookups = hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+            }
+
+
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    enabled=settings.RESULT_CACHE_ENABLED,
+)
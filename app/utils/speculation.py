@@ -0,0 +1,150 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from prometheus_client import Counter as PromCounter
+
+# counters rather than gauges read at scrape time: runs happen in the inference
+# pool processes when it is enabled, and counters aggregate across processes
+SPECULATIVE_RUNS = PromCounter(
+    "trashos_speculative_runs",
+    "Speculative model 2 runs by outcome (wasted / started is the waste ratio)",
+    ["outcome"],
+)
+SPECULATIVE_SKIPPED = PromCounter(
+    "trashos_speculative_skipped",
+    "Requests that did not speculate, by reason",
+    ["reason"],
+)
+
+
+class SpeculativeStage:
+    """
+    Starts stage 2 (material detection) before stage 1 has decided whether it
+    is needed, so inorganic items pay max(model 1, model 2) instead of the sum.
+
+    A run is only started when recent traffic makes 'inorganic' likely (an
+    exponentially weighted share of stage-1 results), load is at most
+    max_load, and one of the speculation threads is idle; nothing is ever
+    queued behind busy speculation threads. Runs whose stage-1 result turns
+    out not inorganic are discarded and counted as wasted.
+
+    Load is the share of `capacity` taken by requests inside track() in this
+    process (the pool workers see none of the API's admission slots), or the
+    caller's figure if that is higher.
+    """
+
+    def __init__(self, enabled: bool, workers: int, min_probability: float, max_load: float,
+                 capacity: int = 1, decay: float = 0.05):
+        self.enabled = enabled
+        self.workers = max(1, workers)
+        self.min_probability = min_probability
+        self.max_load = max_load
+        self.capacity = max(1, capacity)
+        self.decay = decay
+
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._in_flight = 0
+        self._p_inorganic = 0.5
+        self._started = 0
+        self._used = 0
+        self._wasted = 0
+        self._cancelled = 0
+        self._skipped_unlikely = 0
+        self._skipped_load = 0
+        self._skipped_busy = 0
+
+    @contextmanager
+    def track(self):
+        """Count a request as in flight in this process for the duration of the block"""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    @property
+    def load(self) -> float:
+        """Share of capacity used by tracked requests (can exceed 1.0)"""
+        with self._lock:
+            return self._in_flight / self.capacity
+
+    def maybe_start(self, fn: Callable, load: float = 0.0) -> Optional[Future]:
+        """Run fn on an idle speculation thread, or return None if speculation is not worth it now"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            load = max(load, self._in_flight / self.capacity)
+            if self._p_inorganic < self.min_probability:
+                self._skipped_unlikely += 1
+                skipped = "unlikely"
+            elif load > self.max_load:
+                self._skipped_load += 1
+                skipped = "load"
+            elif self._busy >= self.workers:
+                self._skipped_busy += 1
+                skipped = "busy"
+            else:
+                skipped = None
+                self._busy += 1
+                self._started += 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="speculative")
+        if skipped is not None:
+            SPECULATIVE_SKIPPED.labels(skipped).inc()
+            return None
+
+        SPECULATIVE_RUNS.labels("started").inc()
+        future = self._executor.submit(fn)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future) -> None:
+        # runs for completed and cancelled runs alike
+        with self._lock:
+            self._busy -= 1
+
+    def observe(self, inorganic: bool) -> None:
+        """Feed every stage-1 outcome into the estimate, speculated or not"""
+        with self._lock:
+            self._p_inorganic += self.decay * ((1.0 if inorganic else 0.0) - self._p_inorganic)
+
+    def take(self, future: Future):
+        """Stage 1 says stage 2 is needed: wait for the speculative result"""
+        with self._lock:
+            self._used += 1
+        SPECULATIVE_RUNS.labels("used").inc()
+        return future.result()
+
+    def discard(self, future: Future) -> None:
+        """Stage 1 says stage 2 is not needed; the forward pass may still finish in the background"""
+        cancelled = future.cancel()
+        with self._lock:
+            self._wasted += 1
+            if cancelled:
+                self._cancelled += 1
+        SPECULATIVE_RUNS.labels("wasted").inc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "workers": self.workers,
+                "busy": self._busy,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "p_inorganic": self._p_inorganic,
+                "started": self._started,
+                "used": self._used,
+                "wasted": self._wasted,
+                "cancelled_before_start": self._cancelled,
+                "skipped_unlikely": self._skipped_unlikely,
+                "skipped_load": self._skipped_load,
+                "skipped_busy": self._skipped_busy,
+                "wasted_ratio": (self._wasted / self._started) if self._started else 0.0,
+            }
@@ -0,0 +1,287 @@
+"""
+Blob storage for uploaded images.
+
+Blobs are content addressed: the key is the sha256 of the stored bytes plus
+the file extension, so identical renditions are stored once. Submissions
+reference blobs through their /api/submissions/files/<key> urls; the number
+of references per key is kept in storage_blobs (see app/db/blob_refs.py) and
+unreferenced blobs are removed by `python -m app.db.blob_refs --gc`.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from app.core.config import settings
+
+FILES_URL = "/api/submissions/files/"
+
+_CONTENT_KEY = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+def blob_key(data: bytes, extension: str) -> str:
+    return hashlib.sha256(data).hexdigest() + extension
+
+
+def key_from_url(url: str) -> str:
+    """Blob key behind a stored /files/ url"""
+    return url.rsplit("/", 1)[-1]
+
+
+def url_for_key(key: str) -> str:
+    return FILES_URL + key
+
+
+def is_valid_key(key: str) -> bool:
+    """Keys are plain file names, never paths"""
+    return bool(key) and "/" not in key and "\\" not in key and not key.startswith(".")
+
+
+def content_etag(key: str) -> Optional[str]:
+    """Strong ETag for content-addressed keys: the content hash itself"""
+    if _CONTENT_KEY.match(key):
+        return f'"{key.split(".", 1)[0]}"'
+    return None
+
+
+def shard_path(key: str) -> str:
+    """ab/cd/abcd...ext for content keys; older uuid-named uploads stay flat"""
+    if _CONTENT_KEY.match(key):
+        return f"{key[0:2]}/{key[2:4]}/{key}"
+    return key
+
+
+class BlobWriter:
+    """
+    A blob streamed into storage chunk by chunk before its content key is known.
+    Chunks go to a .part file; commit(key) moves it under its key once hashed.
+    Used as a context manager, anything not committed is discarded.
+    """
+
+    def __init__(self, tmp: Path):
+        self.tmp = tmp
+        self.committed = False
+        self._file = open(tmp, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def reader(self) -> BinaryIO:
+        """What was written so far, readable from the start (the caller closes it)"""
+        self._file.flush()
+        return open(self.tmp, "rb")
+
+    def commit(self, key: str) -> bool:
+        """Store under key unless it is already there. Returns True if it was written."""
+        self._file.close()
+        self.committed = True
+        try:
+            return self._store(key)
+        finally:
+            self.tmp.unlink(missing_ok=True)
+
+    def _store(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        self._file.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.committed:
+            self.abort()
+
+
+class _LocalBlobWriter(BlobWriter):
+    """The .part file lives under the storage root, so commit is a rename"""
+
+    def __init__(self, storage: "LocalStorage"):
+        self.storage = storage
+        super().__init__(storage._tmp / f"{uuid.uuid4()}.part")
+
+    def _store(self, key: str) -> bool:
+        path = self.storage.local_path(key)
+        if path.exists():
+            # refresh mtime so the garbage collector's grace period starts over
+            os.utime(path)
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp.replace(path)
+        return True
+
+
+class _S3BlobWriter(BlobWriter):
+    """The .part file is a local temp file, uploaded on commit"""
+
+    def __init__(self, storage: "S3Storage"):
+        self.storage = storage
+        fd, path = tempfile.mkstemp(suffix=".part")
+        os.close(fd)
+        super().__init__(Path(path))
+
+    def _store(self, key: str) -> bool:
+        if self.storage.touch(key):
+            return False
+        self.storage.client.upload_file(str(self.tmp), self.storage.bucket, self.storage._object_key(key))
+        return True
+
+
+class LocalStorage:
+    """Blobs as files under root, sharded two levels deep by key prefix"""
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._tmp = root / ".tmp"
+        self._tmp.mkdir(parents=True, exist_ok=True)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self.root / shard_path(key)
+
+    def put(self, key: str, data: bytes) -> bool:
+        """Store a blob unless it is already there. Returns True if it was written."""
+        path = self.local_path(key)
+        if path.exists():
+            # refresh mtime so the garbage collector's grace period starts over
+            os.utime(path)
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp / f"{uuid.uuid4()}.part"
+        try:
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return True
+
+    def writer(self) -> BlobWriter:
+        return _LocalBlobWriter(self)
+
+    def get(self, key: str) -> bytes:
+        return self.local_path(key).read_bytes()
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).exists()
+
+    def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+    def iter_blobs(self) -> Iterator[tuple[str, float]]:
+        """(key, last modified unix time) of every stored blob"""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                yield filename, os.path.getmtime(os.path.join(dirpath, filename))
+
+
+class S3Storage:
+    """
+    Blobs as objects in an S3-compatible bucket, same sharded layout under prefix.
+    endpoint_url points it at MinIO, localstack or moto_server for local testing.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None, region: Optional[str] = None):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package") from e
+        if not bucket:
+            raise ValueError("STORAGE_BACKEND=s3 requires STORAGE_S3_BUCKET")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + shard_path(key)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    def touch(self, key: str) -> bool:
+        """If the blob exists, bump its LastModified (restarting the garbage collector's grace period)"""
+        if not self.exists(key):
+            return False
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._object_key(key)},
+            MetadataDirective="REPLACE",
+        )
+        return True
+
+    def put(self, key: str, data: bytes) -> bool:
+        if self.touch(key):
+            return False
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+        return True
+
+    def writer(self) -> BlobWriter:
+        return _S3BlobWriter(self)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"].read()
+
+    def get_range(self, key: str, http_range: str) -> tuple[bytes, Optional[str]]:
+        """
+        Bytes for an HTTP Range header, parsed by S3. Returns (data, Content-Range or None).
+        Raises ValueError if the range cannot be satisfied.
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key), Range=http_range)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                raise ValueError("Requested range not satisfiable") from e
+            raise
+        return obj["Body"].read(), obj.get("ContentRange")
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def iter_blobs(self) -> Iterator[tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"].rsplit("/", 1)[-1], obj["LastModified"].timestamp()
+
+
+def create_storage():
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(Path(settings.STORAGE_LOCAL_ROOT))
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.STORAGE_S3_BUCKET,
+            prefix=settings.STORAGE_S3_PREFIX,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL,
+            region=settings.STORAGE_S3_REGION,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}', expected local or s3")
+
+
+storage = create_storage()
@@ -0,0 +1,161 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.models.submission import Submission, SubmissionStatus
+from app.utils.image_renditions import InvalidImage, encode_renditions, normalize
+from app.utils.metrics import observe_stage, timed_commit
+from app.utils.ml_core_logic import get_model_version
+from app.utils.ml_func import process_with_ml_model, process_with_ml_model_batch
+from app.utils.result_cache import content_hash, result_cache
+from app.utils.storage import blob_key, key_from_url, storage, url_for_key
+
+logger = get_logger(__name__)
+
+
+def apply_ml_results(submission: Submission, ml_results: dict) -> None:
+    """Copy ML pipeline results onto a submission and mark it classified"""
+    submission.classification = ml_results.get("classification")
+    submission.confidence = ml_results.get("confidence")
+    submission.material_type = ml_results.get("material_type")
+    submission.recyclable = ml_results.get("recyclable")
+    submission.resell_value = ml_results.get("resell_value")
+    submission.co2_saved = ml_results.get("co2_saved")
+    submission.resell_places = ml_results.get("resell_places")
+    submission.model_version = ml_results.get("model_version")
+    submission.status = SubmissionStatus.CLASSIFIED
+
+
+def model_input(data: bytes):
+    """
+    What the models classify for an upload: with IMAGE_NORMALIZE the decoded,
+    normalized image (the pixels the stored WebP is encoded from, not a
+    re-encoded copy), otherwise the upload bytes. Same in every path, so
+    results cached under the upload's hash are consistent.
+    """
+    if settings.IMAGE_NORMALIZE:
+        with observe_stage("image_normalize"):
+            return normalize(data)
+    return data
+
+
+def apply_cached_result(db: Session, submission: Submission, digest: str) -> bool:
+    """Classify a submission from the result cache. Returns False on a miss."""
+    cached = result_cache.get(db, digest, get_model_version())
+    if cached is None:
+        return False
+
+    apply_ml_results(submission, cached)
+    timed_commit(db, "cached_result")
+    db.refresh(submission)
+    return True
+
+
+def classify_submission(
+    db: Session,
+    submission: Submission,
+    image,
+    digest: Optional[str] = None,
+    check_cache: bool = True,
+) -> Submission:
+    """
+    Run the ML pipeline for a submission and persist the outcome.
+    image is the blob key of the stored upload, the upload bytes still in memory,
+    or model_input() of them already (then digest is required).
+    Identical images (same content hash and model version) are answered
+    from the result cache without running the models.
+    Marks the submission FAILED instead of raising if the models error out,
+    including when the pipeline returns its fallback result with an "error" key.
+    """
+    try:
+        data = storage.get(image) if isinstance(image, str) else image
+        if digest is None:
+            digest = content_hash(data)
+
+        if check_cache and apply_cached_result(db, submission, digest):
+            return submission
+
+        if isinstance(data, bytes):
+            data = model_input(data)
+        ml_results = process_with_ml_model(data)
+        if ml_results.get("error"):
+            # the 'unknown' fallback must not count as a classification (rollups, stats)
+            submission.status = SubmissionStatus.FAILED
+            timed_commit(db, "classification_failed")
+            db.refresh(submission)
+            logger.error("ML processing failed", extra={
+                "submission_id": str(submission.id), "error": ml_results["error"]
+            })
+            return submission
+
+        apply_ml_results(submission, ml_results)
+        result_cache.put(db, digest, ml_results.get("model_version"), ml_results)
+
+        timed_commit(db, "classification_result")
+        db.refresh(submission)
+
+    except Exception as ml_error:
+        db.rollback()
+        submission.status = SubmissionStatus.FAILED
+        timed_commit(db, "classification_failed")
+        db.refresh(submission)
+
+        logger.error("ML processing failed", extra={"submission_id": str(submission.id), "error": str(ml_error)})
+
+    return submission
+
+
+def classify_uploads(db: Session, uploads: list[bytes], digests: list[str]) -> list[dict]:
+    """
+    ML results for a set of uploads, in order. Cached images are answered from
+    the result cache; the rest go through the pipeline as one batched run.
+    Failed items come back with an "error" key.
+    """
+    model_version = get_model_version()
+    results = [result_cache.get(db, digest, model_version) for digest in digests]
+
+    misses = []
+    images = []
+    for i, result in enumerate(results):
+        if result is not None:
+            continue
+        try:
+            images.append(model_input(uploads[i]))
+            misses.append(i)
+        except InvalidImage as e:
+            results[i] = {"error": f"Invalid image: {e}"}
+
+    if misses:
+        fresh = process_with_ml_model_batch(images)
+        for i, ml_results in zip(misses, fresh):
+            results[i] = ml_results
+            result_cache.put(db, digests[i], ml_results.get("model_version"), ml_results)
+
+    return results
+
+
+def store_renditions(db: Session, submission: Submission, image=None) -> None:
+    """
+    IMAGE_NORMALIZE: encode the WebP copy and thumbnails and point the
+    submission at them instead of the original upload, which the blob garbage
+    collector removes once nothing references it. Runs on the submission
+    workers, after classification. image is normalize()d already, or None to
+    decode the stored original.
+    """
+    if image is None:
+        image = normalize(storage.get(key_from_url(submission.image_path_url)))
+    with observe_stage("image_encode"):
+        normalized, thumbnails = encode_renditions(image)
+
+    key = blob_key(normalized, ".webp")
+    thumbnail_keys = {size: blob_key(thumbnail, ".webp") for size, thumbnail in thumbnails.items()}
+    with observe_stage("upload_write"):
+        storage.put(key, normalized)
+        for size, thumbnail in thumbnails.items():
+            storage.put(thumbnail_keys[size], thumbnail)
+
+    submission.image_path_url = url_for_key(key)
+    submission.thumbnail_urls = {str(size): url_for_key(k) for size, k in thumbnail_keys.items()} or None
+    timed_commit(db, "renditions")
@@ -0,0 +1,229 @@
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from queue import Empty, Full, Queue
+from typing import Optional
+
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.db.session import SessionLocal
+from app.models.submission import Submission, SubmissionStatus
+from app.utils.image_renditions import InvalidImage
+from app.utils.result_cache import content_hash
+from app.utils.storage import key_from_url, storage
+from app.utils.submission_processing import classify_submission, model_input, store_renditions
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+_CLASSIFY = "classify"
+_RENDER = "render"
+
+
+class SubmissionWorkerPool:
+    """
+    Background threads that classify PENDING submissions.
+
+    Used by the async submission mode: the request handler stores the blob,
+    inserts the row and enqueues its id here, then returns 202 right away.
+    Clients poll GET /submissions/{id} until status leaves PENDING/PROCESSING.
+    A worker claims a row by flipping it to PROCESSING in one UPDATE, so a
+    submission queued in several processes is still classified once.
+
+    With IMAGE_NORMALIZE the workers also write the WebP renditions, after
+    classification: the same decoded image feeds both. Sync uploads queue
+    just that step (enqueue_renditions). If a process dies before it runs,
+    the submission keeps pointing at its original upload.
+    """
+
+    def __init__(self, num_workers: int = 2, max_queue_size: int = 256):
+        self.num_workers = max(1, num_workers)
+        self._queue: Queue = Queue(maxsize=max_queue_size)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._run, name=f"submission-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout=timeout)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def enqueue(self, submission_id: uuid.UUID, blob_key: str, digest: Optional[str] = None) -> bool:
+        """
+        Queue a submission for classification. Returns False if the queue is full.
+        digest is the content hash of the upload, passed along so it is not hashed twice.
+        """
+        return self._put((_CLASSIFY, submission_id, blob_key, digest))
+
+    def enqueue_renditions(self, submission_id: uuid.UUID, blob_key: str) -> bool:
+        """Queue only the WebP renditions of an already classified submission. False if the queue is full."""
+        return self._put((_RENDER, submission_id, blob_key, None))
+
+    def schedule_renditions(self, db, submission: Submission, blob_key: str) -> None:
+        """
+        IMAGE_NORMALIZE: have a worker write the renditions of a submission
+        classified elsewhere; written inline (in db) only when the queue is full.
+        """
+        if not settings.IMAGE_NORMALIZE or self.enqueue_renditions(submission.id, blob_key):
+            return
+        try:
+            store_renditions(db, submission)
+        except Exception:
+            db.rollback()
+            logger.exception("Could not store renditions", extra={"submission_id": str(submission.id)})
+
+    def _put(self, job: tuple) -> bool:
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except Full:
+            return False
+
+    def recover_pending(self, older_than: Optional[float] = None) -> int:
+        """
+        Re-queue submissions a previous process left behind (e.g. after a restart).
+        Only rows untouched for older_than seconds: younger PENDING rows are still
+        queued in another worker or being classified inline by a sync request.
+        Stale PROCESSING rows (claimed by a process that died) go back to PENDING.
+        """
+        if older_than is None:
+            older_than = settings.SUBMISSION_RECOVER_AFTER_SECONDS
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Submission)
+                .where(Submission.status == SubmissionStatus.PROCESSING, Submission.updated_at < cutoff)
+                .values(status=SubmissionStatus.PENDING)
+            )
+            db.commit()
+            pending = db.execute(
+                select(Submission.id, Submission.image_path_url)
+                .where(Submission.status == SubmissionStatus.PENDING, Submission.updated_at < cutoff)
+                .order_by(Submission.created_at)
+            ).all()
+        finally:
+            db.close()
+
+        queued = 0
+        for submission_id, image_path_url in pending:
+            if not self.enqueue(submission_id, key_from_url(image_path_url)):
+                break
+            queued += 1
+        return queued
+
+    @staticmethod
+    def _claim(db, submission_id: uuid.UUID) -> Optional[Submission]:
+        """PENDING -> PROCESSING in one statement; None if the row is gone or someone else has it"""
+        claimed = db.execute(
+            update(Submission)
+            .where(Submission.id == submission_id, Submission.status == SubmissionStatus.PENDING)
+            .values(status=SubmissionStatus.PROCESSING)
+            .returning(Submission.id)
+        ).first()
+        db.commit()
+        if claimed is None:
+            return None
+        return db.get(Submission, submission_id)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=1.0)
+            except Empty:
+                continue
+            if job is _STOP:
+                return
+
+            kind, submission_id, blob_key, digest = job
+            db = SessionLocal()
+            try:
+                if kind == _RENDER:
+                    submission = db.get(Submission, submission_id)
+                    if submission is not None:
+                        store_renditions(db, submission)
+                    continue
+
+                submission = self._claim(db, submission_id)
+                # row deleted or already claimed by another worker / process
+                if submission is None:
+                    continue
+
+                self._classify(db, submission, blob_key, digest)
+                with self._lock:
+                    if submission.status == SubmissionStatus.FAILED:
+                        self._failed += 1
+                    else:
+                        self._processed += 1
+            except InvalidImage as e:
+                logger.warning("Could not render submission image", extra={
+                    "submission_id": str(submission_id), "error": str(e)
+                })
+            except Exception as e:
+                logger.exception("Background processing failed", extra={
+                    "submission_id": str(submission_id), "job": kind
+                })
+                with self._lock:
+                    self._failed += 1
+            finally:
+                db.close()
+
+    @staticmethod
+    def _classify(db, submission: Submission, blob_key: str, digest: Optional[str]) -> None:
+        """Decode the stored upload once for both the models and the renditions"""
+        data = storage.get(blob_key)
+        if digest is None:
+            digest = content_hash(data)
+        try:
+            image = model_input(data)
+        except InvalidImage:
+            # classify_submission marks it FAILED when it cannot decode the bytes either
+            classify_submission(db, submission, data, digest=digest)
+            return
+
+        classify_submission(db, submission, image, digest=digest)
+        if settings.IMAGE_NORMALIZE:
+            try:
+                store_renditions(db, submission, image)
+            except Exception:
+                # the classification stands, the submission keeps its original image
+                db.rollback()
+                logger.exception("Could not store renditions", extra={"submission_id": str(submission.id)})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "processed": self._processed,
+                "failed": self._failed,
+            }
+
+
+submission_workers = SubmissionWorkerPool(
+    num_workers=settings.SUBMISSION_WORKERS,
+    max_queue_size=settings.SUBMISSION_QUEUE_SIZE,
+)
@@ -0,0 +1,269 @@
+"""
+End-to-end load test for the API.
+
+Start the API against a local (migrated) Postgres first. To measure API and
+database overhead without the models, run it with the stub:
+    INFERENCE_STUB_MODELS=true uvicorn app.main:app --port 8000
+
+Then drive it:
+    python -m benchmarks.load --concurrency 16 --requests 500
+    python -m benchmarks.load --scenarios submit list --concurrency 32 --output run.json
+    python -m benchmarks.load --compare benchmarks/results/old.json benchmarks/results/new.json
+
+Each scenario runs on its own (warm-up first, not recorded) and reports
+throughput, p50/p95/p99 latency, errors by status code and the average of
+every Server-Timing entry the API returned. Results are written as JSON to
+benchmarks/results/ unless --output is given.
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# name -> (method, path); submit uploads a generated image, list_cursor walks the
+# list with next_cursor (keyset pagination) and starts over after the last page
+SCENARIOS = {
+    "submit": ("POST", "/api/submissions/"),
+    "list": ("GET", "/api/submissions/?per_page=20"),
+    "list_cursor": ("GET", "/api/submissions/?per_page=20&include_total=false"),
+    "stats_user": ("GET", "/api/stats/user"),
+    "stats_period": ("GET", "/api/stats/period"),
+    "stats_impact": ("GET", "/api/stats/impact"),
+}
+
+
+def make_image(seed: int, size: int) -> bytes:
+    """Small JPEG that differs per seed, so uploads do not hit the result cache"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+    block = max(1, size // 8)
+    for _ in range(24):
+        x, y = rng.randrange(0, size, block), rng.randrange(0, size, block)
+        img.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + block, y + block))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                timings[name] = float(value)
+    return timings
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def login(client: httpx.AsyncClient) -> None:
+    """Register a throwaway user; the auth cookie stays on the client"""
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    response = await client.post("/api/auth/register", json={
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "Bench-Passw0rd!",
+    })
+    response.raise_for_status()
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, total: int, concurrency: int,
+                       warmup: int, image_size: int, image_pool: int) -> dict:
+    method, path = SCENARIOS[name]
+    latencies = []
+    statuses: Counter = Counter()
+    server_timing: dict = defaultdict(list)
+
+    # generated up front so encoding does not stall the event loop mid-run
+    images = {}
+    if name == "submit":
+        # unique seeds per run as well, the result cache also has a database tier
+        offset = int(time.time())
+        for i in range(warmup + total):
+            seed = i % image_pool if image_pool else i + offset
+            images[i] = make_image(seed, image_size)
+    # last next_cursor seen, shared by the workers of list_cursor
+    walk = {"cursor": None}
+
+    async def one(i: int, record: bool) -> None:
+        kwargs = {}
+        if name == "submit":
+            kwargs["files"] = {"file": (f"bench_{i}.jpg", images[i], "image/jpeg")}
+        elif name == "list_cursor" and walk["cursor"]:
+            kwargs["params"] = {"cursor": walk["cursor"]}
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        elapsed = time.perf_counter() - started
+        if name == "list_cursor" and response is not None and response.is_success:
+            walk["cursor"] = response.json().get("next_cursor")
+
+        if not record:
+            return
+        latencies.append(elapsed)
+        statuses[str(status)] += 1
+        if response is not None and "server-timing" in response.headers:
+            for entry, ms in parse_server_timing(response.headers["server-timing"]).items():
+                server_timing[entry].append(ms)
+
+    async def phase(indices, record: bool) -> float:
+        counter = iter(indices)
+
+        async def worker() -> None:
+            # workers share the counter, so at most `concurrency` requests are in flight
+            for i in counter:
+                await one(i, record)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    await phase(range(warmup), record=False)
+    wall = await phase(range(warmup, warmup + total), record=True)
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "method": method,
+        "path": path,
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": dict(statuses),
+        "wall_seconds": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) * 1000.0 if latencies else 0.0,
+            "p50": percentile(latencies, 50) * 1000.0,
+            "p95": percentile(latencies, 95) * 1000.0,
+            "p99": percentile(latencies, 99) * 1000.0,
+            "max": latencies[-1] * 1000.0 if latencies else 0.0,
+        },
+        "server_timing_ms": {entry: sum(values) / len(values) for entry, values in server_timing.items()},
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await login(client)
+        server = (await client.get("/api/health/inference")).json().get("model")
+
+        results = {}
+        for name in args.scenarios:
+            print(f"running {name}: {args.requests} requests, concurrency {args.concurrency}")
+            results[name] = await run_scenario(
+                client, name, args.requests, args.concurrency, args.warmup, args.image_size, args.image_pool
+            )
+            print_scenario(name, results[name])
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "warmup": args.warmup,
+        "image_size": args.image_size,
+        "image_pool": args.image_pool,
+        "server_model": server,
+        "scenarios": results,
+    }
+
+
+def print_scenario(name: str, result: dict) -> None:
+    latency = result["latency_ms"]
+    print(
+        f"  {name}: {result['throughput_rps']:.1f} req/s, "
+        f"p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms, "
+        f"{result['ok']}/{result['requests']} ok {result['statuses']}"
+    )
+    if result["server_timing_ms"]:
+        breakdown = ", ".join(f"{k} {v:.1f}" for k, v in result["server_timing_ms"].items())
+        print(f"    server timing (avg ms): {breakdown}")
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    old = json.loads(old_path.read_text())
+    new = json.loads(new_path.read_text())
+    print(f"{old_path.name} ({old.get('git_commit')}) -> {new_path.name} ({new.get('git_commit')})")
+
+    def change(before: float, after: float) -> str:
+        return f"{(after - before) / before * 100.0:+.1f}%" if before else "n/a"
+
+    for name in sorted(set(old["scenarios"]) & set(new["scenarios"])):
+        a, b = old["scenarios"][name], new["scenarios"][name]
+        print(f"  {name}:")
+        print(f"    throughput {a['throughput_rps']:.1f} -> {b['throughput_rps']:.1f} req/s "
+              f"({change(a['throughput_rps'], b['throughput_rps'])})")
+        for pct in ("p50", "p95", "p99"):
+            before, after = a["latency_ms"][pct], b["latency_ms"][pct]
+            print(f"    {pct} {before:.1f} -> {after:.1f} ms ({change(before, after)})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Recorded requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unrecorded requests per scenario")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--image-size", type=int, default=512, help="Edge length of generated uploads")
+    parser.add_argument("--image-pool", type=int, default=0,
+                        help="Reuse this many distinct images (exercises the result cache); 0 = all unique")
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    report = asyncio.run(run(args))
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+    failed = any(result["ok"] < result["requests"] for result in report["scenarios"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())